@@ -0,0 +1,712 @@
+"""
+Benchmarks de la capa de datos de la API del Gimnasio.
+
+Cada benchmark trabaja sobre una base de datos temporal con datos sintéticos,
+así que nunca toca gimnasio.db.
+
+Uso:
+    python benchmark.py pool [--usuarios 5000] [--segundos 3] [--hilos 4]
+    python benchmark.py busqueda [--usuarios 100000] [--consultas 2000]
+    python benchmark.py paginacion [--usuarios 100000] [--tamano 50] [--pagina 500]
+    python benchmark.py bulk [--usuarios 10000]
+    python benchmark.py escrituras [--operaciones 2000]
+    python benchmark.py snapshot [--usuarios 10000] [--repeticiones 50]
+    python benchmark.py json [--usuarios 10000] [--repeticiones 20]
+    python benchmark.py compresion [--usuarios 10000] [--repeticiones 10] [--mbps 20]
+    python benchmark.py identificacion [--usuarios 100000] [--consultas 5000]
+    python benchmark.py vencimientos [--usuarios 100000] [--dias 30] [--tamano 500]
+    python benchmark.py fechas [--usuarios 100000] [--dias 7]
+    python benchmark.py estadisticas [--usuarios 100000] [--escrituras 5000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# La base de datos temporal debe configurarse antes de importar database
+_DIRECTORIO_TMP = tempfile.mkdtemp(prefix="gimnasio_bench_")
+os.environ["GIMNASIO_DB_PATH"] = os.path.join(_DIRECTORIO_TMP, "bench.db")
+
+import database  # noqa: E402
+import datos_sinteticos  # noqa: E402
+from datos_sinteticos import APELLIDOS, DEPARTAMENTOS, NOMBRES, generar_usuario  # noqa: E402
+from models import UsuarioUpdate  # noqa: E402
+
+def poblar(cantidad: int):
+    """Crear el esquema y cargar usuarios sintéticos"""
+    datos_sinteticos.poblar(cantidad)
+    print(f"📁 Base de datos temporal con {cantidad} usuarios: {database.DB_PATH}")
+
+
+def medir(nombre: str, operacion, segundos: float, hilos: int) -> float:
+    """Ejecutar `operacion` en varios hilos durante `segundos` y devolver operaciones por segundo"""
+    contadores = [0] * hilos
+    errores = [0] * hilos
+    fin = time.perf_counter() + segundos
+
+    def trabajador(indice: int):
+        while time.perf_counter() < fin:
+            try:
+                operacion()
+                contadores[indice] += 1
+            except sqlite3.OperationalError:
+                errores[indice] += 1
+
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    transcurrido = time.perf_counter() - inicio
+
+    total = sum(contadores)
+    ops = total / transcurrido
+    print(f"   {nombre:<28} {ops:>10.0f} ops/s  ({total} ops, {sum(errores)} bloqueos)")
+    return ops
+
+
+def benchmark_pool(args):
+    """Comparar una conexión nueva por petición contra el pool persistente en WAL"""
+    poblar(args.usuarios)
+    max_id = args.usuarios
+
+    # Antes: abrir y cerrar una conexión por operación con el journal por defecto
+    def sin_pool_lectura():
+        conexion = sqlite3.connect(database.DB_PATH)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute("SELECT * FROM usuarios WHERE id = ?", (random.randint(1, max_id),)).fetchone()
+        conexion.close()
+
+    def sin_pool_escritura():
+        conexion = sqlite3.connect(database.DB_PATH)
+        conexion.execute(
+            "UPDATE usuarios SET celular = ? WHERE id = ?",
+            (f"+57 {random.randint(0, 9999999)}", random.randint(1, max_id))
+        )
+        conexion.commit()
+        conexion.close()
+
+    # Después: conexión persistente por hilo a través de database.py
+    def con_pool_lectura():
+        database.obtener_usuario(random.randint(1, max_id))
+
+    def con_pool_escritura():
+        database.actualizar_usuario(
+            random.randint(1, max_id),
+            UsuarioUpdate(celular=f"+57 {random.randint(0, 9999999)}")
+        )
+
+    def mixto(lectura, escritura):
+        def operacion():
+            if random.random() < 0.1:
+                escritura()
+            else:
+                lectura()
+        return operacion
+
+    # El modo de journal es persistente en el archivo: medir "antes" en modo DELETE
+    database.cerrar_conexiones()
+    conexion = sqlite3.connect(database.DB_PATH)
+    conexion.execute("PRAGMA journal_mode = DELETE")
+    conexion.close()
+
+    print(f"\n⏱️  Sin pool (journal DELETE, {args.hilos} hilos, {args.segundos}s)")
+    antes_lectura = medir("lecturas", sin_pool_lectura, args.segundos, args.hilos)
+    antes_mixto = medir("90% lecturas / 10% escrituras", mixto(sin_pool_lectura, sin_pool_escritura), args.segundos, args.hilos)
+
+    print(f"\n⏱️  Con pool (WAL, {args.hilos} hilos, {args.segundos}s)")
+    despues_lectura = medir("lecturas", con_pool_lectura, args.segundos, args.hilos)
+    despues_mixto = medir("90% lecturas / 10% escrituras", mixto(con_pool_lectura, con_pool_escritura), args.segundos, args.hilos)
+
+    print("\n📊 Mejora")
+    print(f"   lecturas: x{despues_lectura / antes_lectura:.2f}")
+    print(f"   mixto:    x{despues_mixto / antes_mixto:.2f}")
+    print(f"   pool:     {database.estadisticas_pool()}")
+
+
+def percentiles(tiempos_ms) -> str:
+    """Resumen p50/p95/p99 de una lista de latencias en milisegundos"""
+    cortes = statistics.quantiles(tiempos_ms, n=100)
+    return f"p50={cortes[49]:.3f}ms p95={cortes[94]:.3f}ms p99={cortes[98]:.3f}ms"
+
+
+def benchmark_busqueda(args):
+    """Latencia de /usuarios/buscar con el índice FTS5 frente al filtrado en Python"""
+    poblar(args.usuarios)
+
+    # Términos como los que escribe el personal: prefijos de nombre/apellido sin tildes y códigos
+    def termino_aleatorio() -> str:
+        opcion = random.random()
+        if opcion < 0.4:
+            return random.choice(APELLIDOS)[:random.randint(2, 6)].lower()
+        if opcion < 0.7:
+            return f"{random.choice(NOMBRES)[:4]} {random.choice(APELLIDOS)[:3]}"
+        return f"GYM{random.randint(1, args.usuarios):06d}"
+
+    terminos = [termino_aleatorio() for _ in range(args.consultas)]
+
+    tiempos_fts = []
+    for termino in terminos:
+        inicio = time.perf_counter()
+        database.buscar_usuarios_texto(termino, 50)
+        tiempos_fts.append((time.perf_counter() - inicio) * 1000)
+
+    # Antes: traer hasta 10.000 filas, construir modelos y filtrar con `in`
+    tiempos_python = []
+    for termino in terminos[:max(args.consultas // 20, 20)]:
+        inicio = time.perf_counter()
+        usuarios = database.obtener_todos_usuarios()
+        t = termino.lower()
+        [u for u in usuarios if t in u.nombre.lower() or t in u.apellido.lower() or (u.codigo and t in u.codigo.lower())]
+        tiempos_python.append((time.perf_counter() - inicio) * 1000)
+
+    print(f"\n⏱️  Búsqueda sobre {args.usuarios} usuarios")
+    print(f"   Python (10.000 filas máx.): {percentiles(tiempos_python)}")
+    print(f"   FTS5 (limit=50):            {percentiles(tiempos_fts)}")
+
+
+def benchmark_paginacion(args):
+    """Latencia de la primera página frente a una página profunda: OFFSET vs cursor"""
+    poblar(args.usuarios)
+    repeticiones = 200
+
+    def medir_offset(pagina: int):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            database.obtener_todos_usuarios(skip=(pagina - 1) * args.tamano, limit=args.tamano)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def medir_cursor(pagina: int):
+        # El cursor de la página N apunta al último ID de la página N-1
+        ultimo_id = 0
+        if pagina > 1:
+            ultimo_id = database.obtener_todos_usuarios(skip=(pagina - 1) * args.tamano - 1, limit=1)[0].id
+        cursor = database.codificar_cursor(ultimo_id) if ultimo_id else None
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            database.obtener_pagina_usuarios(cursor, args.tamano)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    print(f"\n⏱️  Páginas de {args.tamano} usuarios sobre {args.usuarios}")
+    for nombre, medir_pagina in (("OFFSET", medir_offset), ("Cursor", medir_cursor)):
+        for pagina in (1, args.pagina):
+            etiqueta = f"{nombre} página {pagina}:"
+            print(f"   {etiqueta:<24} {percentiles(medir_pagina(pagina))}")
+
+
+def benchmark_bulk(args):
+    """Crear N usuarios uno por uno frente a POST /usuarios/bulk en una sola transacción"""
+    import httpx
+    import main as api
+
+    database.inicializar_bd()
+    # Usuarios distintos en cada pasada: el código y el documento son únicos, repetirlos
+    # mediría el camino de error en vez de la inserción
+    n = args.usuarios
+    uno_a_uno, en_bulk, por_endpoint = (
+        [generar_usuario(i) for i in range(desde + 1, desde + n + 1)] for desde in (0, n, 2 * n)
+    )
+
+    def total_usuarios() -> int:
+        return database.obtener_conexion().execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    inicio = time.perf_counter()
+    for usuario in uno_a_uno:
+        database.crear_usuario(usuario)
+    uno_por_uno = time.perf_counter() - inicio
+    assert total_usuarios() == n, "crear_usuario no creó todos los usuarios"
+
+    inicio = time.perf_counter()
+    _, errores = database.crear_usuarios_bulk(en_bulk)
+    bulk = time.perf_counter() - inicio
+    assert not errores and total_usuarios() == 2 * n, f"crear_usuarios_bulk falló: {list(errores.values())[:3]}"
+
+    # De punta a punta: parseo, validación por elemento e inserción
+    cuerpo = "\n".join(usuario.model_dump_json() for usuario in por_endpoint)
+
+    async def peticion():
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            t0 = time.perf_counter()
+            respuesta = await cliente.post(
+                "/usuarios/bulk", content=cuerpo, headers={"content-type": "application/x-ndjson"}
+            )
+            return time.perf_counter() - t0, respuesta.json()
+
+    endpoint, resultado = asyncio.run(peticion())
+    creados = resultado["procesados"]
+    assert creados == n and total_usuarios() == 3 * n, f"POST /usuarios/bulk no creó todos los usuarios: {resultado['errores'][:3]}"
+
+    print(f"\n⏱️  Creación de {n} usuarios")
+    print(f"   crear_usuario uno por uno:     {uno_por_uno:.3f}s")
+    print(f"   crear_usuarios_bulk:           {bulk:.3f}s (x{uno_por_uno / bulk:.1f})")
+    print(f"   POST /usuarios/bulk (NDJSON):  {endpoint:.3f}s ({creados} creados)")
+
+
+def benchmark_escrituras(args):
+    """Crear, actualizar y eliminar con varias consultas por operación vs una sola con RETURNING"""
+    database.inicializar_bd()
+
+    # Antes: cada paso era una llamada a ejecutar_bd con su propia transacción
+    def insertar(usuario):
+        with database.conexion_bd() as conexion:
+            return conexion.execute(
+                database.SQL_INSERTAR_USUARIO, database._valores_insertar(usuario, "2024-01-01 00:00:00")
+            ).lastrowid
+
+    def actualizar(usuario_id, celular):
+        with database.conexion_bd() as conexion:
+            conexion.execute("UPDATE usuarios SET celular = ?, updated_at = ? WHERE id = ?", (celular, "2024-01-01 00:00:00", usuario_id))
+
+    def eliminar(usuario_id):
+        with database.conexion_bd() as conexion:
+            conexion.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,))
+
+    async def antes(usuarios):
+        ids = []
+        for usuario in usuarios:
+            usuario_id = await database.ejecutar_bd(insertar, usuario)
+            ids.append((await database.ejecutar_bd(database.obtener_usuario, usuario_id)).id)
+        for usuario_id in ids:
+            await database.ejecutar_bd(database.obtener_usuario, usuario_id)
+            await database.ejecutar_bd(actualizar, usuario_id, "+57 300 0000000")
+            await database.ejecutar_bd(database.obtener_usuario, usuario_id)
+        for usuario_id in ids:
+            await database.ejecutar_bd(database.obtener_usuario, usuario_id)
+            await database.ejecutar_bd(eliminar, usuario_id)
+
+    async def despues(usuarios):
+        ids = [(await database.ejecutar_bd(database.crear_usuario, usuario)).id for usuario in usuarios]
+        for usuario_id in ids:
+            await database.ejecutar_bd(database.actualizar_usuario, usuario_id, UsuarioUpdate(celular="+57 300 0000000"))
+        for usuario_id in ids:
+            await database.ejecutar_bd(database.eliminar_usuario, usuario_id)
+
+    usuarios = [generar_usuario(i) for i in range(1, args.operaciones + 1)]
+    operaciones = 3 * args.operaciones
+
+    print(f"\n⏱️  {args.operaciones} usuarios creados, actualizados y eliminados ({operaciones} escrituras)")
+    resultados = {}
+    for nombre, funcion in (("consultas separadas", antes), ("RETURNING", despues)):
+        inicio = time.perf_counter()
+        asyncio.run(funcion(usuarios))
+        resultados[nombre] = operaciones / (time.perf_counter() - inicio)
+        print(f"   {nombre:<20} {resultados[nombre]:>9.0f} escrituras/s")
+
+    print(f"\n🚀 Mejora: x{resultados['RETURNING'] / resultados['consultas separadas']:.2f}")
+
+
+def benchmark_snapshot(args):
+    """Listar, filtrar y buscar por ID desde SQLite frente al snapshot en memoria"""
+    poblar(args.usuarios)
+    ids = [random.randint(1, args.usuarios) for _ in range(args.repeticiones * 100)]
+
+    def lecturas():
+        tiempos = {}
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            database.obtener_todos_usuarios(0, args.usuarios)
+        tiempos["listar todos"] = (time.perf_counter() - inicio) / args.repeticiones * 1000
+        # GET /usuarios: la lista JSON (desde memoria se arma una vez por versión de la tabla)
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            database.obtener_todos_usuarios_json(0, args.usuarios)
+        tiempos["listar todos (JSON)"] = (time.perf_counter() - inicio) / args.repeticiones * 1000
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            database.obtener_todos_usuarios(0, args.usuarios, "Yoga")
+        tiempos["filtrar departamento"] = (time.perf_counter() - inicio) / args.repeticiones * 1000
+        inicio = time.perf_counter()
+        for usuario_id in ids:
+            database.obtener_usuario(usuario_id)
+        tiempos["buscar por ID"] = (time.perf_counter() - inicio) / len(ids) * 1000
+        return tiempos
+
+    sqlite = lecturas()
+    database.snapshot_usuarios.activo = True
+    database.cargar_snapshot()
+    memoria = lecturas()
+    estadisticas = database.estadisticas_snapshot()
+
+    print(f"\n⏱️  Lecturas con {args.usuarios} usuarios (ms por operación)")
+    for nombre in sqlite:
+        print(f"   {nombre:<22} SQLite {sqlite[nombre]:>9.3f}   memoria {memoria[nombre]:>9.3f}   (x{sqlite[nombre] / memoria[nombre]:.1f})")
+    print(f"\n📦 Snapshot: {estadisticas['usuarios']} usuarios, ~{estadisticas['bytes_aproximados'] / 1024 / 1024:.1f} MB")
+
+
+def benchmark_json(args):
+    """GET /usuarios con modelos pydantic y response_model frente al JSON generado por SQLite"""
+    import httpx
+    from typing import List
+    from models import Usuario
+    import main as api
+
+    poblar(args.usuarios)
+
+    # Antes: modelos por fila, revalidación con response_model y serialización de FastAPI
+    @api.app.get("/benchmark/usuarios-modelos", response_model=List[Usuario])
+    async def listar_con_modelos(skip: int = 0, limit: int = 10000):
+        return await database.ejecutar_bd(database.obtener_todos_usuarios, skip, limit)
+
+    async def medir_ruta(ruta: str):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            respuesta = await cliente.get(ruta)
+            tiempos = []
+            for _ in range(args.repeticiones):
+                t0 = time.perf_counter()
+                respuesta = await cliente.get(ruta)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            return statistics.median(tiempos), respuesta.json()
+
+    parametros = f"?limit={args.usuarios}"
+    modelos, cuerpo_modelos = asyncio.run(medir_ruta("/benchmark/usuarios-modelos" + parametros))
+    directo, cuerpo_directo = asyncio.run(medir_ruta("/usuarios" + parametros))
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        database.obtener_todos_usuarios(0, args.usuarios)
+    solo_modelos = (time.perf_counter() - inicio) / args.repeticiones * 1000
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        database.obtener_todos_usuarios_json(0, args.usuarios)
+    solo_json = (time.perf_counter() - inicio) / args.repeticiones * 1000
+
+    print(f"\n⏱️  Listar {args.usuarios} usuarios (mediana de {args.repeticiones} peticiones)")
+    print(f"   obtener_todos_usuarios:        {solo_modelos:>8.1f} ms")
+    print(f"   obtener_todos_usuarios_json:   {solo_json:>8.1f} ms")
+    print(f"   GET con response_model:        {modelos:>8.1f} ms")
+    print(f"   GET /usuarios (JSON de SQLite): {directo:>7.1f} ms (x{modelos / directo:.1f})")
+    print(f"   Mismo contenido: {'✅' if cuerpo_modelos == cuerpo_directo else '❌'}")
+
+
+def benchmark_compresion(args):
+    """Bytes y latencia de GET /usuarios sin comprimir, con gzip y con brotli"""
+    import httpx
+    import main as api
+
+    poblar(args.usuarios)
+
+    async def medir_codificacion(codificacion: str):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            tiempos = []
+            for _ in range(args.repeticiones + 1):
+                t0 = time.perf_counter()
+                # stream() para medir los bytes enviados, antes de que httpx los descomprima
+                async with cliente.stream("GET", f"/usuarios?limit={args.usuarios}", headers={"Accept-Encoding": codificacion}) as respuesta:
+                    enviados = sum([len(bloque) async for bloque in respuesta.aiter_raw()])
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            return enviados, statistics.median(tiempos[1:]), respuesta.headers.get("content-encoding", "ninguna")
+
+    print(f"\n⏱️  GET /usuarios con {args.usuarios} usuarios (mediana de {args.repeticiones}; red estimada de {args.mbps} Mbit/s)")
+    for codificacion in ("identity", "gzip", "br"):
+        enviados, servidor_ms, aplicada = asyncio.run(medir_codificacion(codificacion))
+        red_ms = enviados * 8 / (args.mbps * 1_000_000) * 1000
+        print(
+            f"   {codificacion:<9} → {aplicada:<8} {enviados / 1024:>9.0f} KiB   servidor {servidor_ms:>6.1f} ms"
+            f"   + red {red_ms:>7.1f} ms = {servidor_ms + red_ms:>7.1f} ms"
+        )
+
+
+def benchmark_identificacion(args):
+    """Latencia de las búsquedas exactas por código y por documento (check-in en el kiosco)"""
+    import httpx
+    import main as api
+
+    poblar(args.usuarios)
+    numeros = [random.randint(1, args.usuarios) for _ in range(args.consultas)]
+
+    def medir_funcion(funcion, parametros):
+        tiempos = []
+        for valores in parametros:
+            t0 = time.perf_counter()
+            encontrados = funcion(*valores)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+            assert len(encontrados) == 1
+        return percentiles(tiempos)
+
+    async def medir_endpoint(rutas):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            tiempos = []
+            for ruta in rutas:
+                t0 = time.perf_counter()
+                respuesta = await cliente.get(ruta)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+                assert respuesta.status_code == 200
+            return percentiles(tiempos)
+
+    print(f"\n⏱️  {args.consultas} búsquedas exactas sobre {args.usuarios} usuarios")
+    print(f"   obtener_usuarios_por_codigo:     {medir_funcion(database.obtener_usuarios_por_codigo, [(f'GYM{i:06d}',) for i in numeros])}")
+    print(f"   obtener_usuarios_por_documento:  {medir_funcion(database.obtener_usuarios_por_documento, [('DNI', str(10000000 + i)) for i in numeros])}")
+    print(f"   GET /usuarios/codigo/...:        {asyncio.run(medir_endpoint([f'/usuarios/codigo/GYM{i:06d}' for i in numeros]))}")
+    print(f"   GET /usuarios/documento/...:     {asyncio.run(medir_endpoint([f'/usuarios/documento/DNI/{10000000 + i}' for i in numeros]))}")
+
+
+def benchmark_vencimientos(args):
+    """
+    GET /membresia/por-vencer sobre una base sintética: recorre todas las páginas frente a un
+    filtrado en Python de toda la tabla. Que el resultado coincida y que la consulta use el
+    índice lo comprueba tests/test_vencimientos.py.
+    """
+    from datetime import date, datetime, timedelta
+    import httpx
+    import main as api
+
+    poblar(args.usuarios)
+    hoy = date.today()
+
+    # Antes: traer todos los usuarios y filtrar con strptime en Python
+    inicio = time.perf_counter()
+    esperados = []
+    for usuario in database.obtener_todos_usuarios(0, args.usuarios):
+        fecha_fin = datetime.strptime(usuario.fecha_fin[:10], "%Y-%m-%d").date()
+        if hoy < fecha_fin <= hoy + timedelta(days=args.dias):
+            esperados.append((usuario.fecha_fin, usuario.id))
+    esperados.sort()
+    filtrado_python = (time.perf_counter() - inicio) * 1000
+
+    async def recorrer(departamento=None):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            cursor, filas, tiempos = None, [], []
+            while True:
+                parametros = {"dias": args.dias, "limit": args.tamano}
+                if cursor:
+                    parametros["cursor"] = cursor
+                if departamento:
+                    parametros["departamento"] = departamento
+                t0 = time.perf_counter()
+                respuesta = (await cliente.get("/membresia/por-vencer", params=parametros)).json()
+                tiempos.append((time.perf_counter() - t0) * 1000)
+                filas.extend((usuario["fecha_fin"], usuario["id"]) for usuario in respuesta["usuarios"])
+                cursor = respuesta["next_cursor"]
+                if not cursor:
+                    return filas, tiempos
+
+    _, tiempos = asyncio.run(recorrer())
+    _, tiempos_departamento = asyncio.run(recorrer("Yoga"))
+
+    conexion = database.obtener_conexion()
+    plan = " | ".join(
+        fila[3] for fila in conexion.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM usuarios WHERE fin_dia > ? AND fin_dia <= ? ORDER BY fin_dia, id",
+            (20000, 20030)
+        )
+    )
+
+    print(f"\n⏱️  Membresías que vencen en {args.dias} días sobre {args.usuarios} usuarios: {len(esperados)}")
+    print(f"   Filtrado en Python de toda la tabla: {filtrado_python:.1f} ms")
+    print(f"   /membresia/por-vencer: {len(tiempos)} páginas de {args.tamano}, primera {tiempos[0]:.2f} ms, total {sum(tiempos):.1f} ms")
+    print(f"   Con departamento=Yoga: {len(tiempos_departamento)} páginas, primera {tiempos_departamento[0]:.2f} ms")
+    print(f"   Plan: {plan}")
+
+
+
+def benchmark_fechas(args):
+    """
+    Estado de membresía y cumpleaños: strptime fila por fila en Python vs comparaciones
+    de enteros en SQLite (fin_dia, nacimiento_mmdd). Que coincidan lo comprueba tests/test_fechas.py.
+    """
+    from datetime import date, datetime, timedelta
+
+    poblar(args.usuarios)
+    hoy = date.today()
+
+    # Antes: traer todos los usuarios y parsear las fechas en Python
+    inicio = time.perf_counter()
+    usuarios = database.obtener_todos_usuarios(0, args.usuarios)
+    estados_python = {
+        usuario.id: "VALIDO" if hoy < datetime.strptime(usuario.fecha_fin, "%Y-%m-%d").date() else "VENCIDO"
+        for usuario in usuarios
+    }
+    estados_python_ms = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    ventana = {(dia.month, dia.day) for dia in (hoy + timedelta(days=n) for n in range(args.dias + 1))}
+    cumpleanos_python = set()
+    for usuario in database.obtener_todos_usuarios(0, args.usuarios):
+        nacimiento = datetime.strptime(usuario.fecha_nacimiento, "%Y-%m-%d").date()
+        if (nacimiento.month, nacimiento.day) in ventana:
+            cumpleanos_python.add(usuario.id)
+    cumpleanos_python_ms = (time.perf_counter() - inicio) * 1000
+
+    # Después: la comparación se hace en SQLite
+    inicio = time.perf_counter()
+    estados_sql = database.obtener_estados_membresia(list(range(1, args.usuarios + 1)))
+    estados_sql_ms = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    cumpleanos = database.obtener_cumpleanos(args.dias, args.usuarios)
+    cumpleanos_sql_ms = (time.perf_counter() - inicio) * 1000
+
+    conexion = database.obtener_conexion()
+    plan = " | ".join(
+        fila[3] for fila in conexion.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM usuarios WHERE nacimiento_mmdd BETWEEN ? AND ?", (101, 107)
+        )
+    )
+
+    print(f"\n⏱️  Fechas de {args.usuarios} usuarios")
+    print(f"   Estado de todos, strptime en Python:       {estados_python_ms:.1f} ms")
+    print(f"   Estado de todos, fin_dia en SQLite:        {estados_sql_ms:.1f} ms")
+    print(f"   Cumpleaños en {args.dias} días, Python:          {cumpleanos_python_ms:.1f} ms ({len(cumpleanos_python)} usuarios)")
+    print(f"   Cumpleaños en {args.dias} días, nacimiento_mmdd: {cumpleanos_sql_ms:.1f} ms ({len(cumpleanos)} usuarios)")
+    print(f"   Plan: {plan}")
+
+
+
+def benchmark_estadisticas(args):
+    """
+    GET /estadisticas (contadores de membresia_stats) frente a contar toda la tabla,
+    costo de los triggers en las escrituras y de un cambio de día. Que los contadores
+    coincidan con un conteo completo lo comprueba tests/test_estadisticas.py.
+    """
+    import estadisticas
+    import httpx
+    import main as api
+    from fechas import dia_actual
+
+    poblar(args.usuarios)
+    conexion = database.obtener_conexion()
+
+    async def medir_endpoint(repeticiones: int):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            tiempos = []
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                respuesta = await cliente.get("/estadisticas")
+                tiempos.append((time.perf_counter() - t0) * 1000)
+                assert respuesta.status_code == 200
+            return percentiles(tiempos)
+
+    inicio = time.perf_counter()
+    estadisticas.calcular(conexion, dia_actual())
+    conteo_completo = (time.perf_counter() - inicio) * 1000
+
+    def escrituras(desplazamiento: int) -> float:
+        """Escrituras mezcladas: creación, cambio de departamento y fecha de fin, eliminación"""
+        usuarios = [generar_usuario(desplazamiento + i) for i in range(1, args.escrituras + 1)]
+        inicio = time.perf_counter()
+        ids = [database.crear_usuario(usuario).id for usuario in usuarios]
+        for usuario_id in random.sample(ids, len(ids) // 2):
+            database.actualizar_usuario(usuario_id, UsuarioUpdate(
+                departamento=random.choice(DEPARTAMENTOS), fecha_fin=generar_usuario(usuario_id).fecha_fin
+            ))
+        for usuario_id in random.sample(ids, len(ids) // 4):
+            database.eliminar_usuario(usuario_id)
+        return time.perf_counter() - inicio
+
+    con_triggers = escrituras(args.usuarios)
+
+    # Las mismas escrituras sin los triggers de membresia_stats
+    for trigger in ("membresia_stats_ai", "membresia_stats_au", "membresia_stats_ad"):
+        conexion.execute(f"DROP TRIGGER {trigger}")
+    conexion.commit()
+    sin_triggers = escrituras(args.usuarios + args.escrituras)
+
+    # Cambio de día: retroceder el día guardado 30 días y avanzar de nuevo
+    with database.conexion_bd() as conexion_escritura:
+        estadisticas.reconstruir(conexion_escritura, dia_actual() - 30)
+    inicio = time.perf_counter()
+    vencidas = database.avanzar_dia_estadisticas()
+    cambio_de_dia = (time.perf_counter() - inicio) * 1000
+
+    print(f"\n⏱️  Estadísticas de membresía con {args.usuarios} usuarios")
+    print(f"   Conteo completo de la tabla:   {conteo_completo:.1f} ms")
+    print(f"   GET /estadisticas:             {asyncio.run(medir_endpoint(200))}")
+    print(f"   {args.escrituras} creaciones + {args.escrituras // 2} cambios + {args.escrituras // 4} eliminaciones:")
+    print(f"      con triggers: {con_triggers:.2f}s, sin triggers: {sin_triggers:.2f}s (+{(con_triggers / sin_triggers - 1) * 100:.0f}%)")
+    print(f"   Cambio de día sobre 30 días ({vencidas} vencidas): {cambio_de_dia:.1f} ms")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la API del Gimnasio")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    parser_pool = subparsers.add_parser("pool", help="Conexión por petición vs pool persistente en WAL")
+    parser_pool.add_argument("--usuarios", type=int, default=5000)
+    parser_pool.add_argument("--segundos", type=float, default=3)
+    parser_pool.add_argument("--hilos", type=int, default=4)
+    parser_pool.set_defaults(funcion=benchmark_pool)
+
+    parser_busqueda = subparsers.add_parser("busqueda", help="Latencia de la búsqueda FTS5")
+    parser_busqueda.add_argument("--usuarios", type=int, default=100000)
+    parser_busqueda.add_argument("--consultas", type=int, default=2000)
+    parser_busqueda.set_defaults(funcion=benchmark_busqueda)
+
+    parser_paginacion = subparsers.add_parser("paginacion", help="Página 1 vs página profunda, OFFSET vs cursor")
+    parser_paginacion.add_argument("--usuarios", type=int, default=100000)
+    parser_paginacion.add_argument("--tamano", type=int, default=50)
+    parser_paginacion.add_argument("--pagina", type=int, default=500)
+    parser_paginacion.set_defaults(funcion=benchmark_paginacion)
+
+    parser_bulk = subparsers.add_parser("bulk", help="Creación uno por uno vs /usuarios/bulk")
+    parser_bulk.add_argument("--usuarios", type=int, default=10000)
+    parser_bulk.set_defaults(funcion=benchmark_bulk)
+
+    parser_escrituras = subparsers.add_parser("escrituras", help="Escrituras con varias consultas vs RETURNING")
+    parser_escrituras.add_argument("--operaciones", type=int, default=2000)
+    parser_escrituras.set_defaults(funcion=benchmark_escrituras)
+
+    parser_snapshot = subparsers.add_parser("snapshot", help="Lecturas desde SQLite vs snapshot en memoria")
+    parser_snapshot.add_argument("--usuarios", type=int, default=10000)
+    parser_snapshot.add_argument("--repeticiones", type=int, default=50)
+    parser_snapshot.set_defaults(funcion=benchmark_snapshot)
+
+    parser_json = subparsers.add_parser("json", help="Listado con modelos pydantic vs JSON de SQLite")
+    parser_json.add_argument("--usuarios", type=int, default=10000)
+    parser_json.add_argument("--repeticiones", type=int, default=20)
+    parser_json.set_defaults(funcion=benchmark_json)
+
+    parser_compresion = subparsers.add_parser("compresion", help="GET /usuarios sin comprimir, con gzip y con brotli")
+    parser_compresion.add_argument("--usuarios", type=int, default=10000)
+    parser_compresion.add_argument("--repeticiones", type=int, default=10)
+    parser_compresion.add_argument("--mbps", type=float, default=20, help="Ancho de banda de la red Wi-Fi")
+    parser_compresion.set_defaults(funcion=benchmark_compresion)
+
+    parser_identificacion = subparsers.add_parser("identificacion", help="Búsqueda exacta por código y por documento")
+    parser_identificacion.add_argument("--usuarios", type=int, default=100000)
+    parser_identificacion.add_argument("--consultas", type=int, default=5000)
+    parser_identificacion.set_defaults(funcion=benchmark_identificacion)
+
+    parser_vencimientos = subparsers.add_parser("vencimientos", help="Membresías por vencer: paginación e índice")
+    parser_vencimientos.add_argument("--usuarios", type=int, default=100000)
+    parser_vencimientos.add_argument("--dias", type=int, default=30)
+    parser_vencimientos.add_argument("--tamano", type=int, default=500)
+    parser_vencimientos.set_defaults(funcion=benchmark_vencimientos)
+
+    parser_fechas = subparsers.add_parser("fechas", help="Estado y cumpleaños: Python vs columnas de día en SQLite")
+    parser_fechas.add_argument("--usuarios", type=int, default=100000)
+    parser_fechas.add_argument("--dias", type=int, default=7)
+    parser_fechas.set_defaults(funcion=benchmark_fechas)
+
+    parser_estadisticas = subparsers.add_parser("estadisticas", help="GET /estadisticas, triggers y cambio de día")
+    parser_estadisticas.add_argument("--usuarios", type=int, default=100000)
+    parser_estadisticas.add_argument("--escrituras", type=int, default=5000)
+    parser_estadisticas.set_defaults(funcion=benchmark_estadisticas)
+
+    args = parser.parse_args()
+    try:
+        args.funcion(args)
+    finally:
+        database.cerrar_conexiones()
+        shutil.rmtree(_DIRECTORIO_TMP, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
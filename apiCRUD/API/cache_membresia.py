@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, Optional
+
+from models import EstadoMembresia
+
+# Máximo de usuarios guardados en la caché (se puede cambiar con CACHE_MEMBRESIA_MAX)
+CACHE_MEMBRESIA_MAX = int(os.environ.get("CACHE_MEMBRESIA_MAX", "10000"))
+
+
+class CacheMembresia:
+    """
+    Caché LRU en memoria de EstadoMembresia por ID de usuario.
+
+    El estado solo cambia cuando se modifica el usuario o cuando cambia el día,
+    así que las escrituras invalidan su entrada y toda la caché se descarta al
+    pasar la medianoche local.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MEMBRESIA_MAX):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[int, EstadoMembresia]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dia = date.today()
+        # Cambia con cada invalidación: evita guardar un estado leído antes de una escritura
+        self._version = 0
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+        self.expiraciones = 0
+
+    def _expirar_si_cambio_el_dia(self):
+        """Descartar todo si los estados se calcularon otro día (llamar con el lock tomado)"""
+        hoy = date.today()
+        if hoy != self._dia:
+            self.expiraciones += len(self._entradas)
+            self._entradas.clear()
+            self._dia = hoy
+            self._version += 1
+
+    def version(self) -> int:
+        """Versión actual; se pasa a guardar() para descartar lecturas que quedaron viejas"""
+        with self._lock:
+            self._expirar_si_cambio_el_dia()
+            return self._version
+
+    def obtener(self, usuario_id: int) -> Optional[EstadoMembresia]:
+        with self._lock:
+            self._expirar_si_cambio_el_dia()
+            estado = self._entradas.get(usuario_id)
+            if estado is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(usuario_id)
+            self.aciertos += 1
+            return estado
+
+    def guardar(self, usuario_id: int, estado: EstadoMembresia, version: int):
+        """Guardar un estado calculado a partir de una lectura hecha en `version`"""
+        with self._lock:
+            self._expirar_si_cambio_el_dia()
+            if version != self._version:
+                return
+            self._entradas[usuario_id] = estado
+            self._entradas.move_to_end(usuario_id)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def invalidar(self, usuarios_ids: Iterable[int]):
+        """Descartar los estados de usuarios modificados o eliminados"""
+        with self._lock:
+            self._version += 1
+            for usuario_id in usuarios_ids:
+                if self._entradas.pop(usuario_id, None) is not None:
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._version += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+                "expiraciones": self.expiraciones,
+                "dia": self._dia.isoformat()
+            }
+
+
+# Instancia global usada por los endpoints y por las escrituras de database.py
+cache_estado_membresia = CacheMembresia()
@@ -0,0 +1,198 @@
+"""
+Middleware ASGI de compresión de respuestas (brotli o gzip según Accept-Encoding).
+
+- Solo comprime respuestas de al menos COMPRESION_MINIMO bytes.
+- Nunca comprime imágenes, video ni streams MJPEG (ya vienen comprimidos).
+- Las respuestas en streaming (p. ej. exportaciones) se comprimen bloque a bloque.
+- brotli es opcional: si el paquete no está instalado solo se ofrece gzip.
+
+Este archivo es idéntico en apiCRUD/API/compresion.py y apiFace/API/compresion.py
+(cada API se instala y se despliega por separado): cualquier cambio va en los dos.
+"""
+import asyncio
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+# Configuración (se puede sobreescribir con variables de entorno)
+COMPRESION_MINIMO = int(os.environ.get("COMPRESION_MINIMO", "1024"))  # Bytes
+COMPRESION_NIVEL_GZIP = int(os.environ.get("COMPRESION_NIVEL_GZIP", "6"))  # 1-9
+COMPRESION_NIVEL_BROTLI = int(os.environ.get("COMPRESION_NIVEL_BROTLI", "4"))  # 0-11
+
+# Bloques más grandes que esto se comprimen en un hilo para no detener el event loop
+COMPRESION_EN_HILO = 64 * 1024
+
+# Tipos de contenido que nunca se comprimen
+TIPOS_EXCLUIDOS = ("image/", "video/", "audio/", "multipart/x-mixed-replace", "application/zip", "application/gzip")
+
+
+def elegir_codificacion(accept_encoding: str, con_brotli: bool) -> Optional[str]:
+    """Elegir "br" o "gzip" según Accept-Encoding (respetando q=0); None si no acepta ninguna"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre.strip()] = calidad
+
+    comodin = aceptadas.get("*", 0.0)
+    if con_brotli and aceptadas.get("br", comodin) > 0:
+        return "br"
+    if aceptadas.get("gzip", comodin) > 0:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    """Interfaz común para gzip (zlib) y brotli en modo incremental"""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, nivel_brotli: int):
+        if codificacion == "br":
+            self._brotli = brotli.Compressor(quality=nivel_brotli)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 16 + 15: formato gzip con encabezado y CRC
+            self._zlib = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        """Comprimir un bloque y vaciar el buffer para que el cliente lo reciba ya"""
+        if self._brotli is not None:
+            return self._brotli.process(datos) + self._brotli.flush()
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self, datos: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(datos) + self._brotli.finish()
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_FINISH)
+
+
+def _agregar_vary(headers):
+    """Agregar Accept-Encoding a Vary (sin repetirlo si ya está)"""
+    otros = [(nombre, valor) for nombre, valor in headers if nombre != b"vary"]
+    vary = b", ".join(valor for nombre, valor in headers if nombre == b"vary")
+    if b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary = vary + b", Accept-Encoding" if vary else b"Accept-Encoding"
+    return otros + [(b"vary", vary)]
+
+
+async def _ejecutar(funcion, datos: bytes) -> bytes:
+    """Comprimir en el event loop los bloques chicos y en un hilo los grandes (zlib y brotli liberan el GIL)"""
+    if len(datos) < COMPRESION_EN_HILO:
+        return funcion(datos)
+    return await asyncio.get_running_loop().run_in_executor(None, funcion, datos)
+
+
+class CompresionMiddleware:
+    """
+    Comprime las respuestas HTTP con brotli o gzip.
+
+    Un ETag fuerte pasa a ser débil (W/"...") en la respuesta comprimida, igual que
+    hace nginx: If-None-Match usa comparación débil, así que los 304 siguen funcionando.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimo_bytes: int = COMPRESION_MINIMO,
+        nivel_gzip: int = COMPRESION_NIVEL_GZIP,
+        nivel_brotli: int = COMPRESION_NIVEL_BROTLI
+    ):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for nombre, valor in scope["headers"]:
+            if nombre == b"accept-encoding":
+                accept_encoding = valor.decode("latin-1")
+                break
+        codificacion = elegir_codificacion(accept_encoding, brotli is not None)
+
+        inicio: Optional[dict] = None
+        compresor: Optional[_Compresor] = None
+        sin_comprimir = False
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor, sin_comprimir
+
+            if mensaje["type"] == "http.response.start":
+                if not self._comprimible(mensaje["headers"]):
+                    sin_comprimir = True
+                    await send(mensaje)
+                    return
+                # Toda respuesta que se podría comprimir lleva Vary, aunque esta vez no se
+                # comprima (cliente sin gzip/br o cuerpo chico): un caché no debe mezclarlas
+                inicio = dict(mensaje, headers=_agregar_vary(mensaje["headers"]))
+                if codificacion is None:
+                    sin_comprimir = True
+                    await send(inicio)
+                return
+
+            if mensaje["type"] != "http.response.body" or sin_comprimir:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+
+            if compresor is None:
+                if not mas:
+                    if len(cuerpo) < self.minimo_bytes:
+                        # Respuesta completa y pequeña: no vale la pena comprimirla
+                        await send(inicio)
+                        await send(mensaje)
+                        return
+                    # Respuesta completa: se comprime de una vez y se envía con Content-Length
+                    compresor = _Compresor(codificacion, self.nivel_gzip, self.nivel_brotli)
+                    datos = await _ejecutar(compresor.terminar, cuerpo)
+                    await send(self._inicio_comprimido(inicio, codificacion, len(datos)))
+                    await send({"type": "http.response.body", "body": datos, "more_body": False})
+                    return
+                compresor = _Compresor(codificacion, self.nivel_gzip, self.nivel_brotli)
+                await send(self._inicio_comprimido(inicio, codificacion, None))
+
+            datos = await _ejecutar(compresor.comprimir if mas else compresor.terminar, cuerpo)
+            if datos or not mas:
+                await send({"type": "http.response.body", "body": datos, "more_body": mas})
+
+        await self.app(scope, receive, enviar)
+
+    def _comprimible(self, headers) -> bool:
+        for nombre, valor in headers:
+            if nombre == b"content-encoding":
+                return False
+            if nombre == b"content-type" and valor.decode("latin-1").lower().startswith(TIPOS_EXCLUIDOS):
+                return False
+        return True
+
+    def _inicio_comprimido(self, inicio: dict, codificacion: str, longitud: Optional[int]) -> dict:
+        """Encabezados de la respuesta comprimida (sin Content-Length si es un stream)"""
+        headers = []
+        for nombre, valor in inicio["headers"]:
+            if nombre == b"content-length":
+                continue
+            if nombre == b"etag" and not valor.startswith(b"W/"):
+                valor = b"W/" + valor
+            headers.append((nombre, valor))
+        headers.append((b"content-encoding", codificacion.encode()))
+        if longitud is not None:
+            headers.append((b"content-length", str(longitud).encode()))
+        return dict(inicio, headers=headers)
@@ -1,118 +1,604 @@
+import asyncio
+import base64
+import functools
+import json
+import re
 import sqlite3
-from typing import List, Optional
-from datetime import datetime
-from models import Usuario, UsuarioCreate, UsuarioUpdate
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from datetime import datetime, timedelta
+from models import EstadisticaDepartamento, EstadisticasMembresia, EstadoMembresia, Usuario, UsuarioConEstado, UsuarioCreate, UsuarioUpdate, UsuarioUpdateBulk
+from pool import PoolConexiones
+from cache_membresia import cache_estado_membresia
+from snapshot import SnapshotUsuarios
+from migraciones import aplicar_migraciones, version_actual
+from fechas import dia_actual, fecha_de_dia
+import estadisticas
 import os
 
-# Ruta a la base de datos (en el directorio padre)
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gimnasio.db")
+# Ruta a la base de datos (en el directorio padre, se puede cambiar con GIMNASIO_DB_PATH)
+DB_PATH = os.environ.get(
+    "GIMNASIO_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "gimnasio.db")
+)
 
-def obtener_conexion():
-    """Crear y devolver una conexión a la base de datos"""
-    conexion = sqlite3.connect(DB_PATH)
-    conexion.row_factory = sqlite3.Row  # Para poder acceder a las columnas por nombre
-    return conexion
+# Columnas de la tabla usuarios, en el orden del modelo Usuario
+COLUMNAS_USUARIO = [
+    "id", "nombre", "apellido", "codigo", "departamento", "fecha_nacimiento",
+    "fecha_inicio", "fecha_fin", "celular", "email", "direccion",
+    "tipo_documento", "numero_documento", "created_at", "updated_at"
+]
 
-def inicializar_bd():
-    """Crear la tabla usuarios si no existe"""
-    conexion = obtener_conexion()
-    cursor = conexion.cursor()
-    
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS usuarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        apellido TEXT NOT NULL,
-        codigo TEXT,
-        departamento TEXT NOT NULL,
-        fecha_nacimiento TEXT,
-        fecha_inicio TEXT NOT NULL,
-        fecha_fin TEXT NOT NULL,
-        celular TEXT,
-        email TEXT,
-        direccion TEXT,
-        tipo_documento TEXT,
-        numero_documento TEXT,
-        created_at TEXT,
-        updated_at TEXT
-    )
-    """)
-    
-    conexion.commit()
-    conexion.close()
+# Pool de conexiones persistentes (una por hilo)
+pool = PoolConexiones(DB_PATH)
+
+# Copia en memoria de la tabla usuarios (solo si USUARIOS_EN_MEMORIA=1)
+snapshot_usuarios = SnapshotUsuarios(COLUMNAS_USUARIO)
+
+# Hilos dedicados a la base de datos: acotan las conexiones abiertas y evitan
+# que las consultas bloqueen el event loop de los endpoints async
+SQLITE_HILOS = int(os.environ.get("SQLITE_HILOS", "4"))
+_ejecutor: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+def obtener_conexion() -> sqlite3.Connection:
+    """Devolver la conexión del pool asociada al hilo actual"""
+    return pool.obtener()
 
-def crear_usuario(usuario: UsuarioCreate) -> int:
-    """Crear un nuevo usuario en la base de datos"""
+# Cambios al snapshot de la transacción en curso de cada hilo: se aplican después del commit
+_snapshot_pendiente = threading.local()
+
+# Commit y aplicación al snapshot juntos: los cambios llegan al snapshot en el orden de los commits
+_lock_snapshot = threading.Lock()
+
+@contextmanager
+def conexion_bd():
+    """
+    Usar la conexión del pool dentro de una transacción.
+    Hace commit al salir y rollback si ocurre un error; la conexión no se cierra.
+    Los cambios encolados con _encolar_snapshot se aplican solo si el commit termina bien,
+    así otros hilos nunca ven en el snapshot filas sin confirmar.
+    """
     conexion = obtener_conexion()
-    cursor = conexion.cursor()
-    
-    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cambios = []
+    anteriores = getattr(_snapshot_pendiente, "cambios", None)
+    _snapshot_pendiente.cambios = cambios
+    try:
+        yield conexion
+        if cambios:
+            with _lock_snapshot:
+                conexion.commit()
+                for operacion, argumentos in cambios:
+                    operacion(*argumentos)
+        else:
+            conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        _snapshot_pendiente.cambios = anteriores
+
+def _encolar_snapshot(operacion: Callable, *argumentos) -> None:
+    """Aplicar un cambio al snapshot cuando la transacción actual haga commit (llamar dentro de conexion_bd)"""
+    _snapshot_pendiente.cambios.append((operacion, argumentos))
+
+def _obtener_ejecutor() -> ThreadPoolExecutor:
+    """Crear el ejecutor de la base de datos la primera vez que se usa"""
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(max_workers=SQLITE_HILOS, thread_name_prefix="sqlite")
+    return _ejecutor
+
+async def ejecutar_bd(funcion: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Ejecutar una función de este módulo en los hilos de la base de datos y esperar su resultado.
+    Mientras la consulta corre (o espera un bloqueo de escritura) el event loop sigue atendiendo.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_obtener_ejecutor(), functools.partial(funcion, *args, **kwargs))
+
+def cerrar_conexiones():
+    """Detener los hilos de la base de datos y cerrar todas las conexiones del pool (al apagar la aplicación)"""
+    global _ejecutor
+    if _ejecutor is not None:
+        _ejecutor.shutdown(wait=True)
+        _ejecutor = None
+    pool.cerrar_todas()
+
+def estadisticas_cache_membresia() -> dict:
+    """Estadísticas de la caché de estados de membresía"""
+    return cache_estado_membresia.estadisticas()
+
+def estadisticas_snapshot() -> dict:
+    """Tamaño y versión de la copia en memoria de usuarios"""
+    return snapshot_usuarios.estadisticas()
+
+def cargar_snapshot():
+    """Cargar (o recargar) toda la tabla usuarios en memoria"""
+    snapshot_usuarios.cargar(obtener_conexion().execute("SELECT * FROM usuarios"))
+
+def _aplicar_al_snapshot(conexion: sqlite3.Connection, ids) -> None:
+    """
+    Leer las filas recién escritas dentro de la misma transacción y encolarlas
+    para el snapshot (se aplican después del commit).
+    """
+    if not snapshot_usuarios.activo:
+        return
+    filas = []
+    unicos = list(dict.fromkeys(ids))
+    for inicio in range(0, len(unicos), MAX_PARAMETROS_SQL):
+        bloque = unicos[inicio:inicio + MAX_PARAMETROS_SQL]
+        marcadores = ", ".join("?" * len(bloque))
+        filas.extend(conexion.execute(f"SELECT * FROM usuarios WHERE id IN ({marcadores})", bloque))
+    _encolar_snapshot(snapshot_usuarios.aplicar, filas)
+
+def estadisticas_pool() -> dict:
+    """Estadísticas de uso del pool de conexiones"""
+    return pool.estadisticas()
+
+def inicializar_bd() -> List[int]:
+    """
+    Crear la tabla usuarios si no existe y aplicar las migraciones pendientes.
+    Con USUARIOS_EN_MEMORIA=1 también carga el snapshot de usuarios.
+    """
+    with conexion_bd() as conexion:
+        conexion.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            codigo TEXT,
+            departamento TEXT NOT NULL,
+            fecha_nacimiento TEXT,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            celular TEXT,
+            email TEXT,
+            direccion TEXT,
+            tipo_documento TEXT,
+            numero_documento TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+        """)
     
-    cursor.execute("""
-    INSERT INTO usuarios (
-        nombre, apellido, codigo, departamento, fecha_nacimiento,
-        fecha_inicio, fecha_fin, celular, email, direccion,
-        tipo_documento, numero_documento, created_at, updated_at
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+    aplicadas = aplicar_migraciones(obtener_conexion())
+    # Si la API estuvo apagada al cambiar el día, descontar las membresías que vencieron
+    avanzar_dia_estadisticas()
+    if snapshot_usuarios.activo:
+        cargar_snapshot()
+    return aplicadas
+
+def version_esquema() -> int:
+    """Versión actual del esquema según la tabla schema_version"""
+    with conexion_bd() as conexion:
+        return version_actual(conexion)
+
+def version_usuarios() -> int:
+    """Contador de cambios de la tabla usuarios (aumenta con cada fila insertada, modificada o eliminada)"""
+    with conexion_bd() as conexion:
+        return conexion.execute("SELECT version FROM usuarios_version WHERE id = 1").fetchone()[0]
+
+SQL_INSERTAR_USUARIO = """
+INSERT INTO usuarios (
+    nombre, apellido, codigo, departamento, fecha_nacimiento,
+    fecha_inicio, fecha_fin, celular, email, direccion,
+    tipo_documento, numero_documento, created_at, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columnas que vacías se guardan como NULL: las de índice único (igual que la migración 4,
+# SQLite permite varios NULL en un índice único pero no varios '') y la fecha de nacimiento
+# (UsuarioUpdate la deja en "" para borrarla, igual que la migración 6)
+COLUMNAS_VACIO_NULL = ("codigo", "numero_documento", "fecha_nacimiento")
+
+def _vacio_a_null(valor: Optional[str]) -> Optional[str]:
+    """Quitar espacios y devolver None si el texto queda vacío"""
+    if valor is None:
+        return None
+    return valor.strip() or None
+
+def _valores_insertar(usuario: UsuarioCreate, fecha_actual: str) -> tuple:
+    """Parámetros de SQL_INSERTAR_USUARIO para un usuario"""
+    return (
         usuario.nombre,
         usuario.apellido,
-        usuario.codigo,
+        _vacio_a_null(usuario.codigo),
         usuario.departamento,
-        usuario.fecha_nacimiento,
+        _vacio_a_null(usuario.fecha_nacimiento),
         usuario.fecha_inicio,
         usuario.fecha_fin,
         usuario.celular,
         usuario.email,
         usuario.direccion,
         usuario.tipo_documento,
-        usuario.numero_documento,
+        _vacio_a_null(usuario.numero_documento),
         fecha_actual,
         fecha_actual
-    ))
+    )
+
+def crear_usuario(usuario: UsuarioCreate) -> Usuario:
+    """
+    Crear un nuevo usuario y devolverlo tal como quedó guardado.
+    RETURNING * devuelve la fila en la misma sentencia, sin un SELECT aparte.
+    """
+    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    usuario_id = cursor.lastrowid
-    conexion.commit()
-    conexion.close()
+    with conexion_bd() as conexion:
+        # fetchall() termina la sentencia antes del commit
+        rows = conexion.execute(SQL_INSERTAR_USUARIO + " RETURNING *", _valores_insertar(usuario, fecha_actual)).fetchall()
+        if snapshot_usuarios.activo:
+            _encolar_snapshot(snapshot_usuarios.aplicar, rows)
     
-    return usuario_id
+    return Usuario(**dict(rows[0]))
+
+def crear_usuarios_bulk(usuarios: List[UsuarioCreate]) -> Tuple[List[Optional[int]], Dict[int, str]]:
+    """
+    Crear muchos usuarios en una sola transacción con executemany.
+    Los IDs nuevos se leen después con una sola consulta por rango (id mayor al máximo anterior).
+    Devuelve los IDs en el mismo orden que la entrada (None si el usuario falló)
+    y un diccionario índice -> mensaje de error.
+    """
+    if not usuarios:
+        return [], {}
+    
+    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    valores = [_valores_insertar(usuario, fecha_actual) for usuario in usuarios]
+    
+    with conexion_bd() as conexion:
+        # BEGIN IMMEDIATE toma el bloqueo de escritura: nadie más inserta mientras tanto, así que
+        # las filas con id mayor al máximo actual son exactamente las de esta petición, en orden
+        conexion.execute("BEGIN IMMEDIATE")
+        maximo = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM usuarios").fetchone()[0]
+        try:
+            conexion.execute("SAVEPOINT bulk")
+            conexion.executemany(SQL_INSERTAR_USUARIO, valores)
+            conexion.execute("RELEASE bulk")
+        except sqlite3.IntegrityError:
+            conexion.execute("ROLLBACK TO bulk")
+            conexion.execute("RELEASE bulk")
+        else:
+            if snapshot_usuarios.activo:
+                filas = conexion.execute("SELECT * FROM usuarios WHERE id > ? ORDER BY id", (maximo,)).fetchall()
+                _encolar_snapshot(snapshot_usuarios.aplicar, filas)
+                return [fila["id"] for fila in filas], {}
+            return [fila[0] for fila in conexion.execute("SELECT id FROM usuarios WHERE id > ? ORDER BY id", (maximo,))], {}
+        
+        # Algún usuario viola una restricción: insertar uno por uno para reportar cuál
+        ids: List[Optional[int]] = []
+        errores: Dict[int, str] = {}
+        for indice, parametros in enumerate(valores):
+            try:
+                ids.append(conexion.execute(SQL_INSERTAR_USUARIO, parametros).lastrowid)
+            except sqlite3.IntegrityError as e:
+                ids.append(None)
+                errores[indice] = str(e)
+        _aplicar_al_snapshot(conexion, [usuario_id for usuario_id in ids if usuario_id is not None])
+    
+    return ids, errores
 
 def obtener_usuario(usuario_id: int) -> Optional[Usuario]:
     """Obtener un usuario por su ID"""
-    conexion = obtener_conexion()
-    cursor = conexion.cursor()
+    if snapshot_usuarios.activo:
+        datos = snapshot_usuarios.obtener(usuario_id)
+        return Usuario.model_construct(**datos) if datos else None
     
-    cursor.execute("SELECT * FROM usuarios WHERE id = ?", (usuario_id,))
-    row = cursor.fetchone()
-    conexion.close()
+    with conexion_bd() as conexion:
+        row = conexion.execute("SELECT * FROM usuarios WHERE id = ?", (usuario_id,)).fetchone()
     
     if row:
         return Usuario(**dict(row))
     return None
 
+def obtener_usuario_campos(usuario_id: int, campos: List[str]) -> Optional[dict]:
+    """Obtener solo algunas columnas de un usuario (`campos` validados con parsear_campos)"""
+    if snapshot_usuarios.activo:
+        datos = snapshot_usuarios.obtener(usuario_id)
+        return {campo: datos[campo] for campo in campos} if datos else None
+    
+    with conexion_bd() as conexion:
+        row = conexion.execute(f"SELECT {', '.join(campos)} FROM usuarios WHERE id = ?", (usuario_id,)).fetchone()
+    
+    return dict(row) if row else None
+
 def obtener_todos_usuarios(skip: int = 0, limit: int = 10000, departamento: Optional[str] = None) -> List[Usuario]:
     """Obtener todos los usuarios con paginación y filtrado opcional"""
-    conexion = obtener_conexion()
-    cursor = conexion.cursor()
+    if snapshot_usuarios.activo:
+        # Las filas del snapshot ya fueron validadas al guardarse
+        return [Usuario.model_construct(**datos) for datos in snapshot_usuarios.listar(skip, limit, departamento)]
+    
+    with conexion_bd() as conexion:
+        cursor = conexion.cursor()
+        
+        if departamento:
+            cursor.execute(
+                "SELECT * FROM usuarios WHERE departamento = ? ORDER BY id LIMIT ? OFFSET ?",
+                (departamento, limit, skip)
+            )
+        else:
+            cursor.execute("SELECT * FROM usuarios ORDER BY id LIMIT ? OFFSET ?", (limit, skip))
+        
+        rows = cursor.fetchall()
+    
+    return [Usuario(**dict(row)) for row in rows]
+
+def obtener_todos_usuarios_json(
+    skip: int = 0,
+    limit: int = 10000,
+    departamento: Optional[str] = None,
+    campos: Optional[List[str]] = None
+) -> bytes:
+    """
+    Igual que obtener_todos_usuarios, pero devuelve directamente el arreglo JSON (UTF-8).
+    SQLite arma cada objeto con json_object, así que no se crean diccionarios ni
+    modelos por fila; los datos ya se validaron al escribirse.
+    `campos` (validados con parsear_campos) limita las columnas leídas y enviadas.
+    """
+    campos = campos or COLUMNAS_USUARIO
+    if snapshot_usuarios.activo:
+        return version_usuarios_json(skip, limit, departamento, campos)[1]
+    
+    objeto = "json_object(" + ", ".join(f"'{columna}', {columna}" for columna in campos) + ")"
+    with conexion_bd() as conexion:
+        if departamento:
+            rows = conexion.execute(
+                f"SELECT {objeto} FROM usuarios WHERE departamento = ? ORDER BY id LIMIT ? OFFSET ?",
+                (departamento, limit, skip)
+            ).fetchall()
+        else:
+            rows = conexion.execute(
+                f"SELECT {objeto} FROM usuarios ORDER BY id LIMIT ? OFFSET ?", (limit, skip)
+            ).fetchall()
     
+    return ("[" + ",".join(row[0] for row in rows) + "]").encode()
+
+# Listas JSON servidas desde el snapshot, por versión de la tabla (se descartan cuando cambia)
+MAX_LISTAS_JSON_SNAPSHOT = 16
+_listas_json_snapshot: Dict[tuple, bytes] = {}
+_lock_listas_json = threading.Lock()
+
+def version_usuarios_json(
+    skip: int = 0,
+    limit: int = 10000,
+    departamento: Optional[str] = None,
+    campos: Optional[List[str]] = None
+) -> Tuple[int, Optional[bytes]]:
+    """
+    Versión de la tabla usuarios y, con el snapshot activo, la lista JSON que le corresponde.
+    Ambas se leen bajo _lock_snapshot, el mismo lock con el que conexion_bd hace commit y aplica
+    los cambios al snapshot, así el ETag nunca queda con una versión nueva y filas viejas.
+    La lista ya serializada se guarda por versión: mientras nadie escriba no se vuelve a armar.
+    Sin snapshot devuelve (versión, None) y la lista se lee con obtener_todos_usuarios_json.
+    """
+    if not snapshot_usuarios.activo:
+        return version_usuarios(), None
+    
+    campos = campos or COLUMNAS_USUARIO
+    with _lock_snapshot:
+        version = version_usuarios()
+        clave = (version, skip, limit, departamento, tuple(campos))
+        with _lock_listas_json:
+            contenido = _listas_json_snapshot.get(clave)
+        if contenido is not None:
+            return version, contenido
+        usuarios = snapshot_usuarios.listar(skip, limit, departamento, campos)
+    
+    # La serialización (lo más caro) se hace fuera del lock para no frenar los commits
+    contenido = json.dumps(usuarios, ensure_ascii=False).encode()
+    with _lock_listas_json:
+        for anterior in [clave_anterior for clave_anterior in _listas_json_snapshot if clave_anterior[0] != version]:
+            del _listas_json_snapshot[anterior]
+        if len(_listas_json_snapshot) >= MAX_LISTAS_JSON_SNAPSHOT:
+            _listas_json_snapshot.pop(next(iter(_listas_json_snapshot)))
+        _listas_json_snapshot[clave] = contenido
+    return version, contenido
+
+def _codificar_datos_cursor(datos: dict) -> str:
+    """Codificar la posición de una página como un cursor opaco (JSON en base64 URL-safe)"""
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def _decodificar_datos_cursor(cursor: str) -> dict:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(datos, dict):
+        raise ValueError("Cursor inválido")
+    return datos
+
+def codificar_cursor(ultimo_id: int) -> str:
+    """Cursor de la paginación por ID"""
+    return _codificar_datos_cursor({"id": ultimo_id})
+
+def decodificar_cursor(cursor: str) -> int:
+    """Obtener el último ID de un cursor; lanza ValueError si el cursor no es válido"""
+    ultimo_id = _decodificar_datos_cursor(cursor).get("id")
+    if not isinstance(ultimo_id, int):
+        raise ValueError("Cursor inválido")
+    return ultimo_id
+
+def obtener_pagina_usuarios(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    departamento: Optional[str] = None
+) -> Tuple[List[Usuario], Optional[str]]:
+    """
+    Obtener una página de usuarios con paginación por cursor (keyset) sobre el ID.
+    A diferencia de OFFSET, el costo no crece con el número de página y las
+    inserciones o eliminaciones concurrentes no duplican ni saltan filas.
+    Devuelve los usuarios y el cursor de la página siguiente (None si es la última).
+    """
+    ultimo_id = decodificar_cursor(cursor) if cursor else 0
+    
+    if snapshot_usuarios.activo:
+        rows = snapshot_usuarios.pagina(ultimo_id, limit + 1, departamento)
+        usuarios = [Usuario.model_construct(**datos) for datos in rows[:limit]]
+        next_cursor = codificar_cursor(usuarios[-1].id) if len(rows) > limit else None
+        return usuarios, next_cursor
+    
+    with conexion_bd() as conexion:
+        # Se pide una fila extra para saber si existe una página siguiente
+        if departamento:
+            rows = conexion.execute(
+                "SELECT * FROM usuarios WHERE departamento = ? AND id > ? ORDER BY id LIMIT ?",
+                (departamento, ultimo_id, limit + 1)
+            ).fetchall()
+        else:
+            rows = conexion.execute(
+                "SELECT * FROM usuarios WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, limit + 1)
+            ).fetchall()
+    
+    usuarios = [Usuario(**dict(row)) for row in rows[:limit]]
+    next_cursor = codificar_cursor(usuarios[-1].id) if len(rows) > limit else None
+    return usuarios, next_cursor
+
+def parsear_campos(fields: Optional[str]) -> List[str]:
+    """
+    Convertir "nombre,apellido,fecha_fin" en una lista de columnas válidas.
+    Sin campos devuelve todas las columnas; lanza ValueError si alguna no existe.
+    """
+    if not fields:
+        return list(COLUMNAS_USUARIO)
+    campos = list(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+    invalidos = [campo for campo in campos if campo not in COLUMNAS_USUARIO]
+    if invalidos:
+        raise ValueError(f"Campos inválidos: {', '.join(invalidos)}. Disponibles: {', '.join(COLUMNAS_USUARIO)}")
+    if not campos:
+        raise ValueError("Debe indicar al menos un campo")
+    return campos
+
+def abrir_exportacion(campos: List[str], departamento: Optional[str] = None) -> sqlite3.Cursor:
+    """
+    Abrir un cursor sobre todos los usuarios (ordenados por ID) en una conexión dedicada.
+    Las filas se leen en bloques con fetchmany y se ven como una única instantánea;
+    hay que cerrar `cursor.connection` al terminar.
+    """
+    conexion = pool.abrir_dedicada()
+    conexion.row_factory = None  # Tuplas: más livianas que sqlite3.Row para exportar
+    # `campos` ya viene validado contra COLUMNAS_USUARIO por parsear_campos
+    columnas = ", ".join(campos)
+    try:
+        if departamento:
+            return conexion.execute(
+                f"SELECT {columnas} FROM usuarios WHERE departamento = ? ORDER BY id", (departamento,)
+            )
+        return conexion.execute(f"SELECT {columnas} FROM usuarios ORDER BY id")
+    except Exception:
+        conexion.close()
+        raise
+
+# Columnas de la lista de membresías por vencer (lo que necesita recepción para llamar al socio)
+COLUMNAS_POR_VENCER = ["id", "nombre", "apellido", "codigo", "departamento", "celular", "email", "fecha_fin"]
+
+def codificar_cursor_vencimiento(fin_dia: int, ultimo_id: int) -> str:
+    """Cursor de /membresia/por-vencer: la página sigue después de (fin_dia, id)"""
+    return _codificar_datos_cursor({"d": fin_dia, "id": ultimo_id})
+
+def decodificar_cursor_vencimiento(cursor: str) -> Tuple[int, int]:
+    datos = _decodificar_datos_cursor(cursor)
+    if not isinstance(datos.get("d"), int) or not isinstance(datos.get("id"), int):
+        raise ValueError("Cursor inválido")
+    return datos["d"], datos["id"]
+
+def abrir_por_vencer(
+    dias: int,
+    departamento: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 500
+) -> sqlite3.Cursor:
+    """
+    Abrir un cursor (en una conexión dedicada) sobre las membresías vigentes que vencen
+    en los próximos `dias` días, ordenadas por fecha de fin y luego por ID.
+
+    Cada fila es (objeto JSON, fin_dia, id). Como la fecha de fin es el primer día
+    NO válido, vencen en los próximos N días las que tienen fin_dia entre mañana y
+    hoy + N. La condición es un rango de enteros sobre el índice de fin_dia, así que
+    SQLite recorre solo ese tramo.
+    Se devuelven hasta `limit + 1` filas: la extra indica que hay otra página.
+    Lanza ValueError si el cursor no es válido; hay que cerrar `cursor.connection` al terminar.
+    """
+    hoy = dia_actual()
+    condiciones = ["fin_dia > ?", "fin_dia <= ?"]
+    parametros: list = [hoy, hoy + dias]
     if departamento:
-        cursor.execute(
-            "SELECT * FROM usuarios WHERE departamento = ? LIMIT ? OFFSET ?",
-            (departamento, limit, skip)
+        condiciones.append("departamento = ?")
+        parametros.append(departamento)
+    if cursor:
+        condiciones.append("(fin_dia, id) > (?, ?)")
+        parametros.extend(decodificar_cursor_vencimiento(cursor))
+    
+    objeto = "json_object(" + ", ".join(f"'{columna}', {columna}" for columna in COLUMNAS_POR_VENCER)
+    objeto += ", 'dias_restantes', fin_dia - ?)"
+    
+    conexion = pool.abrir_dedicada()
+    conexion.row_factory = None
+    try:
+        return conexion.execute(
+            f"SELECT {objeto}, fin_dia, id FROM usuarios WHERE {' AND '.join(condiciones)} "
+            "ORDER BY fin_dia, id LIMIT ?",
+            [hoy] + parametros + [limit + 1]
         )
-    else:
-        cursor.execute("SELECT * FROM usuarios LIMIT ? OFFSET ?", (limit, skip))
+    except Exception:
+        conexion.close()
+        raise
+
+# Máximo de coincidencias sobre las que se calcula el ranking bm25
+MAX_CANDIDATOS_RANKING = 500
+
+def construir_consulta_fts(termino: str) -> Optional[str]:
+    """
+    Convertir el texto del buscador en una consulta FTS5 de prefijos.
+    "Pér jua" -> '"Pér"* "jua"*' (todas las palabras deben coincidir).
+    Devuelve None si el término no contiene palabras.
+    """
+    palabras = re.findall(r"\w+", termino)
+    if not palabras:
+        return None
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+def buscar_usuarios_texto(termino: str, limit: int = 50) -> List[Usuario]:
+    """
+    Buscar usuarios por nombre, apellido o código usando el índice FTS5.
+    Ignora tildes y mayúsculas, busca por prefijo y ordena por relevancia (bm25).
+    """
+    consulta = construir_consulta_fts(termino)
+    if consulta is None:
+        return []
     
-    rows = cursor.fetchall()
-    conexion.close()
+    with conexion_bd() as conexion:
+        # Calcular bm25 cuesta por cada coincidencia; con términos muy cortos ("g", "pe")
+        # casi toda la tabla coincide y la relevancia no aporta, así que se ordena por ID
+        candidatos = conexion.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM usuarios_fts WHERE usuarios_fts MATCH ? LIMIT ?)",
+            (consulta, MAX_CANDIDATOS_RANKING + 1)
+        ).fetchone()[0]
+        
+        if candidatos > MAX_CANDIDATOS_RANKING:
+            orden = "usuarios_fts.rowid"
+        else:
+            orden = "bm25(usuarios_fts)"
+        
+        rows = conexion.execute(f"""
+        SELECT usuarios.*
+        FROM usuarios_fts
+        JOIN usuarios ON usuarios.id = usuarios_fts.rowid
+        WHERE usuarios_fts MATCH ?
+        ORDER BY {orden}
+        LIMIT ?
+        """, (consulta, limit)).fetchall()
     
     return [Usuario(**dict(row)) for row in rows]
 
-def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> bool:
-    """Actualizar un usuario existente"""
-    conexion = obtener_conexion()
-    cursor = conexion.cursor()
-    
+def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> Optional[Usuario]:
+    """
+    Actualizar un usuario existente y devolverlo ya actualizado.
+    Devuelve None si el usuario no existe (el UPDATE no afectó ninguna fila).
+    """
     # Construir la consulta dinámicamente solo con los campos proporcionados
     campos_actualizar = []
     valores = []
@@ -127,7 +613,7 @@ def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> bool:
     
     if usuario.codigo is not None:
         campos_actualizar.append("codigo = ?")
-        valores.append(usuario.codigo)
+        valores.append(_vacio_a_null(usuario.codigo))
     
     if usuario.departamento is not None:
         campos_actualizar.append("departamento = ?")
@@ -135,7 +621,7 @@ def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> bool:
     
     if usuario.fecha_nacimiento is not None:
         campos_actualizar.append("fecha_nacimiento = ?")
-        valores.append(usuario.fecha_nacimiento)
+        valores.append(_vacio_a_null(usuario.fecha_nacimiento))
     
     if usuario.fecha_inicio is not None:
         campos_actualizar.append("fecha_inicio = ?")
@@ -163,7 +649,7 @@ def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> bool:
     
     if usuario.numero_documento is not None:
         campos_actualizar.append("numero_documento = ?")
-        valores.append(usuario.numero_documento)
+        valores.append(_vacio_a_null(usuario.numero_documento))
     
     # Siempre actualizar updated_at
     campos_actualizar.append("updated_at = ?")
@@ -172,21 +658,228 @@ def actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate) -> bool:
     # Agregar el ID al final
     valores.append(usuario_id)
     
-    if campos_actualizar:
-        query = f"UPDATE usuarios SET {', '.join(campos_actualizar)} WHERE id = ?"
-        cursor.execute(query, valores)
-        conexion.commit()
+    query = f"UPDATE usuarios SET {', '.join(campos_actualizar)} WHERE id = ? RETURNING *"
+    with conexion_bd() as conexion:
+        rows = conexion.execute(query, valores).fetchall()
+        if rows and snapshot_usuarios.activo:
+            _encolar_snapshot(snapshot_usuarios.aplicar, rows)
     
-    conexion.close()
-    return True
+    if not rows:
+        return None
+    cache_estado_membresia.invalidar([usuario_id])
+    return Usuario(**dict(rows[0]))
 
 def eliminar_usuario(usuario_id: int) -> bool:
-    """Eliminar un usuario por su ID"""
-    conexion = obtener_conexion()
-    cursor = conexion.cursor()
+    """Eliminar un usuario por su ID. Devuelve False si el usuario no existía"""
+    with conexion_bd() as conexion:
+        eliminado = conexion.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,)).rowcount > 0
+        if eliminado and snapshot_usuarios.activo:
+            _encolar_snapshot(snapshot_usuarios.eliminar, [usuario_id])
+    
+    if eliminado:
+        cache_estado_membresia.invalidar([usuario_id])
+    return eliminado
+
+def actualizar_usuarios_bulk(usuarios: List[UsuarioUpdateBulk]) -> Dict[int, str]:
+    """
+    Actualizar muchos usuarios en una sola transacción.
+    Las actualizaciones que modifican los mismos campos se agrupan en un executemany.
+    Devuelve un diccionario índice -> mensaje de error (IDs inexistentes o restricciones).
+    """
+    if not usuarios:
+        return {}
+    
+    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    errores: Dict[int, str] = {}
     
-    cursor.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,))
-    conexion.commit()
-    conexion.close()
+    with conexion_bd() as conexion:
+        conexion.execute("BEGIN IMMEDIATE")
+        existentes = _ids_existentes(conexion, [usuario.id for usuario in usuarios])
+        
+        # Agrupar por conjunto de campos para compartir la misma sentencia UPDATE
+        grupos: Dict[Tuple[str, ...], List[Tuple[int, tuple]]] = {}
+        for indice, usuario in enumerate(usuarios):
+            if usuario.id not in existentes:
+                errores[indice] = f"Usuario con ID {usuario.id} no encontrado"
+                continue
+            campos = usuario.model_dump(exclude={"id"}, exclude_none=True)
+            for columna in COLUMNAS_VACIO_NULL:
+                if columna in campos:
+                    campos[columna] = _vacio_a_null(campos[columna])
+            columnas = tuple(campos)
+            parametros = tuple(campos.values()) + (fecha_actual, usuario.id)
+            grupos.setdefault(columnas, []).append((indice, parametros))
+        
+        for columnas, filas in grupos.items():
+            asignaciones = ", ".join([f"{columna} = ?" for columna in columnas] + ["updated_at = ?"])
+            query = f"UPDATE usuarios SET {asignaciones} WHERE id = ?"
+            try:
+                conexion.execute("SAVEPOINT bulk")
+                conexion.executemany(query, [parametros for _, parametros in filas])
+                conexion.execute("RELEASE bulk")
+                continue
+            except sqlite3.IntegrityError:
+                conexion.execute("ROLLBACK TO bulk")
+                conexion.execute("RELEASE bulk")
+            for indice, parametros in filas:
+                try:
+                    conexion.execute(query, parametros)
+                except sqlite3.IntegrityError as e:
+                    errores[indice] = str(e)
+        _aplicar_al_snapshot(conexion, [usuario.id for usuario in usuarios if usuario.id in existentes])
+    cache_estado_membresia.invalidar(usuario.id for usuario in usuarios)
     
-    return True
+    return errores
+
+def eliminar_usuarios_bulk(ids: List[int]) -> List[int]:
+    """
+    Eliminar muchos usuarios en una sola transacción.
+    Devuelve los IDs que no existían.
+    """
+    if not ids:
+        return []
+    
+    with conexion_bd() as conexion:
+        conexion.execute("BEGIN IMMEDIATE")
+        existentes = _ids_existentes(conexion, ids)
+        conexion.executemany("DELETE FROM usuarios WHERE id = ?", [(usuario_id,) for usuario_id in existentes])
+        if snapshot_usuarios.activo:
+            _encolar_snapshot(snapshot_usuarios.eliminar, existentes)
+    cache_estado_membresia.invalidar(existentes)
+    
+    return [usuario_id for usuario_id in ids if usuario_id not in existentes]
+
+# Máximo de parámetros por consulta (el límite por defecto de SQLite antiguo es 999)
+MAX_PARAMETROS_SQL = 900
+
+def _ids_existentes(conexion: sqlite3.Connection, ids: List[int]) -> set:
+    """IDs de la lista que existen en la tabla usuarios"""
+    unicos = list(dict.fromkeys(ids))
+    existentes = set()
+    for inicio in range(0, len(unicos), MAX_PARAMETROS_SQL):
+        bloque = unicos[inicio:inicio + MAX_PARAMETROS_SQL]
+        marcadores = ", ".join("?" * len(bloque))
+        existentes.update(
+            row[0] for row in conexion.execute(f"SELECT id FROM usuarios WHERE id IN ({marcadores})", bloque)
+        )
+    return existentes
+
+# Estado de membresía calculado en SQLite: recibe el número de día de hoy (dia_actual()).
+# La fecha de fin es el primer día NO válido; una fecha de fin inválida (fin_dia NULL) cuenta como vencida
+SQL_ESTADO_MEMBRESIA = "CASE WHEN ? < fin_dia THEN 'VALIDO' ELSE 'VENCIDO' END"
+
+def obtener_estado_membresia(usuario_id: int) -> Optional[EstadoMembresia]:
+    """Estado de membresía de un usuario, calculado en la misma consulta que lo busca"""
+    with conexion_bd() as conexion:
+        row = conexion.execute(f"""
+        SELECT nombre, apellido, fecha_inicio, fecha_fin, {SQL_ESTADO_MEMBRESIA} AS estado
+        FROM usuarios WHERE id = ?
+        """, (dia_actual(), usuario_id)).fetchone()
+    return EstadoMembresia(**dict(row)) if row else None
+
+def obtener_estados_membresia(ids: List[int]) -> Dict[int, str]:
+    """
+    Estado de membresía (VALIDO o VENCIDO) de muchos usuarios con una consulta indexada por ID.
+    La comparación con la fecha de hoy se hace en SQLite. Los IDs inexistentes no aparecen en el resultado.
+    """
+    hoy = dia_actual()
+    estados: Dict[int, str] = {}
+    unicos = list(dict.fromkeys(ids))
+    
+    with conexion_bd() as conexion:
+        for inicio in range(0, len(unicos), MAX_PARAMETROS_SQL):
+            bloque = unicos[inicio:inicio + MAX_PARAMETROS_SQL]
+            marcadores = ", ".join("?" * len(bloque))
+            estados.update(conexion.execute(f"""
+            SELECT id, {SQL_ESTADO_MEMBRESIA}
+            FROM usuarios
+            WHERE id IN ({marcadores})
+            """, [hoy] + bloque).fetchall())
+    
+    return estados
+
+def _buscar_con_estado(condicion: str, parametros: tuple) -> List[UsuarioConEstado]:
+    """
+    Usuarios que cumplen una condición de igualdad indexada, con su estado de membresía
+    en la misma consulta. Se piden hasta 2 filas para detectar valores repetidos.
+    """
+    hoy = dia_actual()
+    with conexion_bd() as conexion:
+        rows = conexion.execute(
+            f"SELECT *, {SQL_ESTADO_MEMBRESIA} AS estado FROM usuarios WHERE {condicion} LIMIT 2",
+            (hoy,) + parametros
+        ).fetchall()
+    return [UsuarioConEstado(**dict(row)) for row in rows]
+
+def obtener_usuarios_por_codigo(codigo: str) -> List[UsuarioConEstado]:
+    """Buscar por código exacto (índice único idx_usuarios_codigo_unico)"""
+    return _buscar_con_estado("codigo = ?", (codigo.strip(),))
+
+def obtener_usuarios_por_documento(tipo_documento: str, numero_documento: str) -> List[UsuarioConEstado]:
+    """Buscar por tipo y número de documento (índice único idx_usuarios_documento_unico)"""
+    return _buscar_con_estado(
+        "numero_documento = ? AND tipo_documento = ?", (numero_documento.strip(), tipo_documento.strip())
+    )
+
+def obtener_cumpleanos(dias: int = 0, limit: int = 500) -> List[Usuario]:
+    """
+    Usuarios que cumplen años entre hoy y dentro de `dias` días, en orden de cumpleaños.
+
+    Compara enteros mes * 100 + día sobre el índice de nacimiento_mmdd; si la ventana
+    pasa por fin de año se buscan dos tramos (hasta el 31/12 y desde el 1/1).
+    Los nacidos un 29 de febrero aparecen cuando la ventana pasa del 28/02 al 01/03.
+    """
+    hoy = datetime.now().date()
+    desde = hoy.month * 100 + hoy.day
+    fin = hoy + timedelta(days=dias)
+    hasta = fin.month * 100 + fin.day
+
+    if dias >= 365:
+        condicion, parametros = "nacimiento_mmdd IS NOT NULL", []
+    elif desde <= hasta:
+        condicion, parametros = "nacimiento_mmdd BETWEEN ? AND ?", [desde, hasta]
+    else:
+        condicion, parametros = "(nacimiento_mmdd >= ? OR nacimiento_mmdd <= ?)", [desde, hasta]
+
+    with conexion_bd() as conexion:
+        # Primero los que cumplen antes del 1/1 (mmdd >= desde), luego los del año siguiente
+        rows = conexion.execute(
+            f"SELECT * FROM usuarios WHERE {condicion} "
+            "ORDER BY nacimiento_mmdd < ?, nacimiento_mmdd, id LIMIT ?",
+            parametros + [desde, limit]
+        ).fetchall()
+    return [Usuario(**dict(row)) for row in rows]
+
+def avanzar_dia_estadisticas() -> int:
+    """Pasar los contadores de membresia_stats al día de hoy; devuelve cuántas membresías vencieron"""
+    with conexion_bd() as conexion:
+        # La lectura del día y el descuento van en la misma transacción de escritura
+        conexion.execute("BEGIN IMMEDIATE")
+        return estadisticas.avanzar_dia(conexion, dia_actual())
+
+def obtener_estadisticas_membresia() -> EstadisticasMembresia:
+    """
+    Miembros y membresías activas por departamento, leídos de membresia_stats
+    (una fila por departamento, sin recorrer la tabla usuarios).
+    """
+    with conexion_bd() as conexion:
+        dia, contadores = estadisticas.leer(conexion)
+    if dia != dia_actual():
+        # El cambio de día de medianoche todavía no corrió
+        avanzar_dia_estadisticas()
+        with conexion_bd() as conexion:
+            dia, contadores = estadisticas.leer(conexion)
+
+    departamentos = [
+        EstadisticaDepartamento(departamento=departamento, total=total, activos=activos, vencidos=total - activos)
+        for departamento, (total, activos) in contadores.items()
+    ]
+    total = sum(departamento.total for departamento in departamentos)
+    activos = sum(departamento.activos for departamento in departamentos)
+    return EstadisticasMembresia(
+        fecha=fecha_de_dia(dia),
+        total=total,
+        activos=activos,
+        vencidos=total - activos,
+        departamentos=departamentos
+    )
@@ -0,0 +1,64 @@
+"""
+Usuarios sintéticos para los benchmarks y las pruebas (nunca tocan gimnasio.db:
+quien los usa configura GIMNASIO_DB_PATH con una base de datos temporal).
+"""
+import random
+
+import database
+from models import UsuarioCreate
+
+DEPARTAMENTOS = ["Cardio", "Pesas", "Yoga", "Crossfit", "Natación", "Funcional"]
+NOMBRES = [
+    "Juan", "María", "José", "Ana", "Luis", "Lucía", "Carlos", "Sofía", "Andrés", "Valentina",
+    "Jorge", "Camila", "Miguel", "Daniela", "Pedro", "Isabel", "Ramón", "Mónica", "Raúl", "Inés",
+    "Diego", "Paula", "Sebastián", "Natalia", "Tomás", "Elena", "Julián", "Verónica", "Óscar", "Adriana"
+]
+APELLIDOS = [
+    "Pérez", "García", "López", "Martínez", "Gómez", "Rodríguez", "Fernández", "Díaz", "Sánchez",
+    "Ramírez", "Torres", "Flores", "Rivera", "Gutiérrez", "Morales", "Ortiz", "Chávez", "Ruiz",
+    "Jiménez", "Hernández", "Vargas", "Castillo", "Romero", "Álvarez", "Mendoza", "Núñez", "Ríos",
+    "Cabrera", "Aguilar", "Peña", "Suárez", "Medina", "Rojas", "Cortés", "Muñoz", "Guzmán"
+]
+
+
+def generar_usuario(i: int) -> UsuarioCreate:
+    """Generar un usuario sintético"""
+    anio_fin = random.choice([2024, 2025, 2026, 2027])
+    return UsuarioCreate(
+        nombre=random.choice(NOMBRES),
+        apellido=random.choice(APELLIDOS),
+        codigo=f"GYM{i:06d}",
+        departamento=random.choice(DEPARTAMENTOS),
+        fecha_nacimiento=f"{random.randint(1960, 2008)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        fecha_inicio=f"{anio_fin - 1}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        fecha_fin=f"{anio_fin}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        celular=f"+57 300 {i:07d}",
+        email=f"socio{i}@example.com",
+        direccion=f"Calle {i % 200} #{i % 90}-{i % 50}",
+        tipo_documento="DNI",
+        numero_documento=f"{10000000 + i}"
+    )
+
+
+def poblar(cantidad: int):
+    """Crear el esquema y cargar `cantidad` usuarios sintéticos con IDs 1..cantidad"""
+    database.inicializar_bd()
+    conexion = database.obtener_conexion()
+    conexion.executemany(
+        """
+        INSERT INTO usuarios (
+            nombre, apellido, codigo, departamento, fecha_nacimiento,
+            fecha_inicio, fecha_fin, celular, email, direccion,
+            tipo_documento, numero_documento, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+        """,
+        (
+            (
+                u.nombre, u.apellido, u.codigo, u.departamento, u.fecha_nacimiento,
+                u.fecha_inicio, u.fecha_fin, u.celular, u.email, u.direccion,
+                u.tipo_documento, u.numero_documento
+            )
+            for u in (generar_usuario(i) for i in range(1, cantidad + 1))
+        )
+    )
+    conexion.commit()
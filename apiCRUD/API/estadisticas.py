@@ -0,0 +1,133 @@
+"""
+Contadores de membresías por departamento (tabla membresia_stats).
+
+Los triggers de la migración 7 mantienen en membresia_stats el total de usuarios
+y las membresías activas de cada departamento en cada INSERT, UPDATE y DELETE de
+usuarios, así que leerlos no depende de la cantidad de socios. "Activa" se
+calcula respecto al día guardado en membresia_stats_dia (activa si fin_dia > dia);
+al cambiar el día, avanzar_dia() descuenta las membresías que vencieron.
+
+Uso desde la línea de comandos (verifica los contadores y los reconstruye si no coinciden):
+    python estadisticas.py ../gimnasio.db
+    python estadisticas.py ../gimnasio.db --reconstruir
+"""
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from fechas import dia_actual
+
+# (total, activos) por departamento
+Contadores = Dict[str, Tuple[int, int]]
+
+
+def leer(conexion: sqlite3.Connection) -> Tuple[Optional[int], Contadores]:
+    """Devolver el día de los contadores y los contadores guardados (una fila por departamento)"""
+    row = conexion.execute("SELECT dia FROM membresia_stats_dia WHERE id = 1").fetchone()
+    contadores = {
+        departamento: (total, activos)
+        for departamento, total, activos in conexion.execute(
+            "SELECT departamento, total, activos FROM membresia_stats ORDER BY departamento"
+        )
+    }
+    return (row[0] if row else None), contadores
+
+
+def calcular(conexion: sqlite3.Connection, dia: int) -> Contadores:
+    """Contar desde cero recorriendo toda la tabla usuarios (para verificar o reconstruir)"""
+    return {
+        departamento: (total, activos)
+        for departamento, total, activos in conexion.execute("""
+        SELECT departamento, COUNT(*), IFNULL(SUM(fin_dia > ?), 0)
+        FROM usuarios GROUP BY departamento ORDER BY departamento
+        """, (dia,))
+    }
+
+
+def reconstruir(conexion: sqlite3.Connection, dia: int):
+    """Reemplazar los contadores por los calculados desde cero para el día dado"""
+    conexion.execute("DELETE FROM membresia_stats")
+    conexion.execute("""
+    INSERT INTO membresia_stats (departamento, total, activos)
+    SELECT departamento, COUNT(*), IFNULL(SUM(fin_dia > ?), 0)
+    FROM usuarios GROUP BY departamento
+    """, (dia,))
+    conexion.execute("INSERT OR REPLACE INTO membresia_stats_dia (id, dia) VALUES (1, ?)", (dia,))
+
+
+def avanzar_dia(conexion: sqlite3.Connection, dia: int) -> int:
+    """
+    Pasar los contadores al día dado y devolver cuántas membresías vencieron.
+
+    Solo se cuentan las membresías con fin_dia entre el día anterior y el nuevo
+    (un tramo del índice de fin_dia). Si el día guardado es posterior (el reloj
+    volvió atrás) se reconstruye todo. Llamar dentro de una transacción
+    BEGIN IMMEDIATE para que ninguna escritura se cuele entre la lectura y el descuento.
+    """
+    anterior, _ = leer(conexion)
+    if anterior is None or dia < anterior:
+        reconstruir(conexion, dia)
+        return 0
+    if dia == anterior:
+        return 0
+
+    vencidas = conexion.execute("""
+    SELECT departamento, COUNT(*) FROM usuarios
+    WHERE fin_dia > ? AND fin_dia <= ?
+    GROUP BY departamento
+    """, (anterior, dia)).fetchall()
+    conexion.executemany(
+        "UPDATE membresia_stats SET activos = activos - ? WHERE departamento = ?",
+        [(cantidad, departamento) for departamento, cantidad in vencidas]
+    )
+    conexion.execute("UPDATE membresia_stats_dia SET dia = ? WHERE id = 1", (dia,))
+    return sum(cantidad for _, cantidad in vencidas)
+
+
+def diferencias(conexion: sqlite3.Connection) -> List[str]:
+    """Comparar los contadores guardados con un conteo completo; lista vacía si coinciden"""
+    dia, guardados = leer(conexion)
+    if dia is None:
+        return ["Sin día de referencia en membresia_stats_dia"]
+    esperados = calcular(conexion, dia)
+    return [
+        f"{departamento}: guardado {guardados.get(departamento, (0, 0))}, real {esperados.get(departamento, (0, 0))} (total, activos)"
+        for departamento in sorted(set(guardados) | set(esperados))
+        if guardados.get(departamento, (0, 0)) != esperados.get(departamento, (0, 0))
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verificar y reconstruir los contadores de membresías")
+    parser.add_argument("ruta", nargs="?", default="../gimnasio.db", help="Ruta de la base de datos")
+    parser.add_argument("--reconstruir", action="store_true", help="Reconstruir aunque coincidan")
+    args = parser.parse_args()
+
+    from migraciones import aplicar_migraciones
+
+    conexion = sqlite3.connect(args.ruta, isolation_level=None)
+    try:
+        # Las tablas y los triggers los crea la migración 7
+        aplicar_migraciones(conexion)
+        conexion.execute("BEGIN IMMEDIATE")
+        vencidas = avanzar_dia(conexion, dia_actual())
+        errores = diferencias(conexion)
+        for error in errores:
+            print(f"⚠️  {error}")
+        if errores or args.reconstruir:
+            reconstruir(conexion, dia_actual())
+            print("🔧 Contadores reconstruidos desde la tabla usuarios")
+        conexion.execute("COMMIT")
+        if not errores:
+            print("✅ Los contadores coinciden con la tabla usuarios")
+        print(f"📊 Membresías vencidas al avanzar el día: {vencidas}")
+        _, contadores = leer(conexion)
+        for departamento, (total, activos) in contadores.items():
+            print(f"   {departamento}: {activos} activas de {total}")
+    except Exception:
+        if conexion.in_transaction:
+            conexion.execute("ROLLBACK")
+        raise
+    finally:
+        conexion.close()
@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from typing import Any, Optional
+
+# Formatos de texto aceptados al importar fechas (además de ISO 8601)
+FORMATOS_FECHA = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+# Día 0 de la columna fin_dia (días desde 1970-01-01, ver migraciones.py)
+EPOCA = date(1970, 1, 1)
+
+
+# Función para extraer fecha del formato MongoDB
+def extraer_fecha(fecha_obj):
+    if not fecha_obj:
+        return None
+    if isinstance(fecha_obj, dict):
+        if '$date' in fecha_obj:
+            fecha_str = fecha_obj['$date']
+            if isinstance(fecha_str, str):
+                # Formato ISO: "2025-11-25T00:00:00.000Z"
+                try:
+                    dt = datetime.fromisoformat(fecha_str.replace('Z', '+00:00'))
+                    return dt.strftime('%Y-%m-%d %H:%M:%S')
+                except:
+                    return None
+            elif isinstance(fecha_str, dict) and '$numberLong' in fecha_str:
+                # Formato timestamp: {"$numberLong": "-239500800000"}
+                try:
+                    timestamp = int(fecha_str['$numberLong']) / 1000
+                    dt = datetime.fromtimestamp(timestamp)
+                    return dt.strftime('%Y-%m-%d %H:%M:%S')
+                except:
+                    return None
+    return None
+
+
+def normalizar_fecha(valor: Any) -> Optional[str]:
+    """
+    Convertir una fecha importada a YYYY-MM-DD.
+    Acepta el formato de MongoDB ({"$date": ...}, vía extraer_fecha), textos ISO 8601
+    y los formatos de FORMATOS_FECHA. Devuelve None si el valor está vacío o no es una fecha.
+    """
+    if isinstance(valor, dict):
+        valor = extraer_fecha(valor)
+    if not valor or not isinstance(valor, str):
+        return None
+
+    valor = valor.strip()
+    # Caso común (YYYY-MM-DD, como se guardan): date.fromisoformat es mucho más rápido que strptime
+    if len(valor) == 10 and valor[4] == '-' and valor[7] == '-':
+        try:
+            return date.fromisoformat(valor).isoformat()
+        except ValueError:
+            return None
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(valor.replace('Z', '+00:00')).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def dia_de(fecha: date) -> int:
+    """Número de día de una fecha, en la misma escala que la columna fin_dia"""
+    return (fecha - EPOCA).days
+
+
+def dia_actual() -> int:
+    """Número de día de hoy (fecha local del servidor)"""
+    return dia_de(datetime.now().date())
+
+
+def fecha_de_dia(dia: int) -> str:
+    """Fecha YYYY-MM-DD de un número de día"""
+    return date.fromordinal(EPOCA.toordinal() + dia).isoformat()
@@ -0,0 +1,302 @@
+"""
+Importación masiva de usuarios desde archivos CSV o NDJSON.
+
+El archivo se procesa en bloques: nunca se carga completo en memoria, solo el
+lote de usuarios pendiente de insertar (TAMANO_LOTE). Cada lote se inserta con
+crear_usuarios_bulk (executemany + un commit por lote).
+
+Uso desde la línea de comandos:
+    python importacion.py socios.csv
+    python importacion.py socios.ndjson --lote 2000
+"""
+import codecs
+import csv
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from database import crear_usuarios_bulk
+from fechas import normalizar_fecha
+from models import UsuarioCreate
+
+FORMATOS_IMPORTACION = ("csv", "ndjson")
+TAMANO_BLOQUE = 64 * 1024  # Bytes leídos por bloque desde el archivo
+TAMANO_LOTE = 1000  # Usuarios por executemany/commit
+MAX_ERRORES_REPORTADOS = 100  # Los errores se cuentan todos pero solo se guardan los primeros
+
+CAMPOS_FECHA = ("fecha_nacimiento", "fecha_inicio", "fecha_fin")
+
+
+class LectorRegistros:
+    """
+    Convierte bloques de texto en registros completos (diccionarios).
+    Guarda solo el texto del registro incompleto al final de cada bloque.
+    """
+
+    def __init__(self, formato: str):
+        if formato not in FORMATOS_IMPORTACION:
+            raise ValueError(f"Formato no soportado: {formato}. Use: {', '.join(FORMATOS_IMPORTACION)}")
+        self.formato = formato
+        self._pendiente = ""
+        self._encabezado: Optional[List[str]] = None
+        self._numero = 0
+
+    def alimentar(self, texto: str) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+        """Agregar un bloque de texto y devolver los registros completos como (número, registro, error)"""
+        self._pendiente += texto
+        lineas = self._pendiente.split("\n")
+        self._pendiente = lineas.pop()
+        return self._procesar_lineas(lineas)
+
+    def finalizar(self) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+        """Procesar el texto restante al terminar el archivo"""
+        lineas = [self._pendiente] if self._pendiente else []
+        self._pendiente = ""
+        return self._procesar_lineas(lineas, final=True)
+
+    def _procesar_lineas(self, lineas: List[str], final: bool = False):
+        if self.formato == "ndjson":
+            return [self._registro_ndjson(linea) for linea in lineas if linea.strip()]
+
+        # En CSV un campo entre comillas puede contener saltos de línea: se juntan
+        # líneas hasta que las comillas queden balanceadas
+        registros = []
+        acumulado = None
+        for linea in lineas:
+            acumulado = linea if acumulado is None else acumulado + "\n" + linea
+            if acumulado.count('"') % 2 == 0:
+                if acumulado.strip():
+                    registros.append(self._registro_csv(acumulado))
+                acumulado = None
+        if acumulado is not None:
+            if final:
+                registros.append(self._registro_csv(acumulado))
+            else:
+                # Registro aún incompleto: vuelve al texto pendiente
+                self._pendiente = acumulado + "\n" + self._pendiente
+        return [registro for registro in registros if registro is not None]
+
+    def _registro_ndjson(self, linea: str):
+        self._numero += 1
+        try:
+            registro = json.loads(linea)
+        except ValueError as e:
+            return self._numero, None, f"JSON inválido: {e}"
+        if not isinstance(registro, dict):
+            return self._numero, None, "Se esperaba un objeto JSON"
+        return self._numero, registro, None
+
+    def _registro_csv(self, texto: str):
+        valores = next(csv.reader([texto]))
+        if self._encabezado is None:
+            self._encabezado = [columna.strip().lower() for columna in valores]
+            return None
+        self._numero += 1
+        if len(valores) != len(self._encabezado):
+            return self._numero, None, f"Se esperaban {len(self._encabezado)} columnas, se recibieron {len(valores)}"
+        return self._numero, {columna: (valor if valor != "" else None) for columna, valor in zip(self._encabezado, valores)}, None
+
+
+class Importacion:
+    """
+    Estado y progreso de una importación.
+    alimentar() devuelve los lotes listos para insertar e insertar() los guarda.
+    """
+
+    def __init__(self, formato: str, tamano_lote: int = TAMANO_LOTE):
+        self.lector = LectorRegistros(formato)
+        self.formato = formato
+        self.tamano_lote = tamano_lote
+        self._lote: List[Tuple[int, UsuarioCreate]] = []
+        self._lock = threading.Lock()
+        self._decoder = decodificador()
+
+        self.estado = "en_curso"
+        self.iniciada_en = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.finalizada_en: Optional[str] = None
+        self.bytes_leidos = 0
+        self.procesados = 0
+        self.creados = 0
+        self.fallidos = 0
+        self.autocompletados = 0
+        self.errores: List[Dict[str, Any]] = []
+
+        # Fechas por defecto (mismo criterio que migrar_a_sqlite.py)
+        self._fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+        self._fecha_manana = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    def procesar(self, bloque: bytes, final: bool = False) -> int:
+        """
+        Decodificar, validar e insertar un bloque del archivo (final=True al terminar).
+        Bloquea mientras inserta: desde la API se llama en los hilos de la base de datos.
+        Devuelve la cantidad de lotes insertados.
+        """
+        lotes = self.alimentar(self._decoder.decode(bloque, final=final), len(bloque))
+        if final:
+            lotes += self.finalizar()
+        for lote in lotes:
+            self.insertar(lote)
+        return len(lotes)
+
+    def alimentar(self, texto: str, bytes_leidos: int = 0) -> List[List[Tuple[int, UsuarioCreate]]]:
+        """Procesar un bloque de texto y devolver los lotes completos"""
+        self.bytes_leidos += bytes_leidos
+        return self._agregar(self.lector.alimentar(texto))
+
+    def finalizar(self) -> List[List[Tuple[int, UsuarioCreate]]]:
+        """Procesar el final del archivo y devolver el último lote (si quedó alguno)"""
+        lotes = self._agregar(self.lector.finalizar())
+        if self._lote:
+            lotes.append(self._lote)
+            self._lote = []
+        return lotes
+
+    def insertar(self, lote: List[Tuple[int, UsuarioCreate]]):
+        """Insertar un lote en una transacción y actualizar el progreso"""
+        ids, errores = crear_usuarios_bulk([usuario for _, usuario in lote])
+        with self._lock:
+            self.creados += sum(1 for usuario_id in ids if usuario_id is not None)
+            for posicion, mensaje in errores.items():
+                self._registrar_error(lote[posicion][0], mensaje)
+
+    def terminar(self, estado: str = "completada"):
+        self.estado = estado
+        self.finalizada_en = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "formato": self.formato,
+                "iniciada_en": self.iniciada_en,
+                "finalizada_en": self.finalizada_en,
+                "bytes_leidos": self.bytes_leidos,
+                "procesados": self.procesados,
+                "creados": self.creados,
+                "fallidos": self.fallidos,
+                "autocompletados": self.autocompletados,
+                "errores": list(self.errores)
+            }
+
+    def _agregar(self, registros) -> List[List[Tuple[int, UsuarioCreate]]]:
+        lotes = []
+        for numero, registro, error in registros:
+            with self._lock:
+                self.procesados += 1
+                if error is None:
+                    usuario, error = self._preparar_usuario(registro)
+                if error is not None:
+                    self._registrar_error(numero, error)
+                    continue
+            self._lote.append((numero, usuario))
+            if len(self._lote) >= self.tamano_lote:
+                lotes.append(self._lote)
+                self._lote = []
+        return lotes
+
+    def _preparar_usuario(self, registro: Dict[str, Any]) -> Tuple[Optional[UsuarioCreate], Optional[str]]:
+        """Normalizar un registro y validarlo con UsuarioCreate"""
+        datos = {campo: registro.get(campo) for campo in UsuarioCreate.model_fields}
+
+        # Para departamento, usar departamento_nombre si existe, sino "Sin departamento"
+        datos["departamento"] = datos["departamento"] or registro.get("departamento_nombre") or "Sin departamento"
+
+        # Una fecha con texto que no se puede interpretar es un error del registro;
+        # solo las que faltan se autocompletan
+        invalidas = []
+        for campo in CAMPOS_FECHA:
+            valor = datos[campo]
+            if valor is None or (isinstance(valor, str) and not valor.strip()):
+                datos[campo] = None
+                continue
+            datos[campo] = normalizar_fecha(valor)
+            if datos[campo] is None:
+                invalidas.append(f"{campo} - Fecha inválida: {valor}")
+        if invalidas:
+            return None, ", ".join(invalidas)
+
+        # Autocompletar fechas si faltan
+        if not datos["fecha_inicio"]:
+            datos["fecha_inicio"] = self._fecha_hoy
+            self.autocompletados += 1
+        if not datos["fecha_fin"]:
+            datos["fecha_fin"] = self._fecha_manana
+            self.autocompletados += 1
+
+        for campo, valor in datos.items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                datos[campo] = str(valor)  # Documentos o celulares escritos como números
+            elif isinstance(valor, str):
+                datos[campo] = valor.strip()
+
+        try:
+            return UsuarioCreate(**datos), None
+        except ValidationError as e:
+            return None, ", ".join(f"{'.'.join(str(parte) for parte in err['loc'])} - {err['msg']}" for err in e.errors())
+
+    def _registrar_error(self, numero: int, mensaje: str):
+        self.fallidos += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({"registro": numero, "error": mensaje})
+
+
+def decodificador():
+    """Decodificador UTF-8 incremental (tolera el BOM de Excel y caracteres partidos entre bloques)"""
+    return codecs.getincrementaldecoder("utf-8-sig")()
+
+
+def importar_archivo(ruta: str, formato: Optional[str] = None, tamano_lote: int = TAMANO_LOTE) -> Importacion:
+    """Importar un archivo leyéndolo en bloques de TAMANO_BLOQUE bytes, mostrando el progreso"""
+    if formato is None:
+        formato = "csv" if ruta.lower().endswith(".csv") else "ndjson"
+    importacion = Importacion(formato, tamano_lote)
+
+    def mostrar_progreso(lotes: int):
+        if lotes:
+            print(f"   ⏳ {importacion.procesados} registros procesados, {importacion.creados} creados, {importacion.fallidos} fallidos")
+
+    try:
+        with open(ruta, "rb") as archivo:
+            while True:
+                bloque = archivo.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                mostrar_progreso(importacion.procesar(bloque))
+        mostrar_progreso(importacion.procesar(b"", final=True))
+        importacion.terminar()
+    except Exception:
+        importacion.terminar("error")
+        raise
+    return importacion
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importar usuarios desde un archivo CSV o NDJSON")
+    parser.add_argument("archivo", help="Ruta del archivo a importar")
+    parser.add_argument("--formato", choices=FORMATOS_IMPORTACION, help="Por defecto se deduce de la extensión")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Usuarios por transacción")
+    args = parser.parse_args()
+
+    from database import inicializar_bd, cerrar_conexiones
+
+    inicializar_bd()
+    try:
+        print(f"📥 Importando {args.archivo}...")
+        resultado = importar_archivo(args.archivo, args.formato, args.lote).resumen()
+    finally:
+        cerrar_conexiones()
+
+    print("\n" + "=" * 50)
+    print("RESUMEN DE IMPORTACIÓN")
+    print("=" * 50)
+    print(f"✅ Usuarios creados: {resultado['creados']}")
+    print(f"❌ Registros fallidos: {resultado['fallidos']}")
+    print(f"📝 Campos autocompletados: {resultado['autocompletados']}")
+    print(f"📊 Total de registros procesados: {resultado['procesados']}")
+    for error in resultado["errores"][:10]:
+        print(f"   ⚠️  Registro {error['registro']}: {error['error']}")
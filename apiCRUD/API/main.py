@@ -1,17 +1,69 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from datetime import datetime
-from models import Usuario, UsuarioCreate, UsuarioUpdate, EstadoMembresia
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncIterator, List, Literal, Optional, Tuple, Type
+from datetime import datetime, time, timedelta
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+from models import (
+    Usuario,
+    UsuarioCreate,
+    UsuarioUpdate,
+    UsuarioUpdateBulk,
+    EstadoMembresia,
+    EstadisticasMembresia,
+    ConsultaEstadosMembresia,
+    EstadosMembresia,
+    PaginaUsuarios,
+    EliminarUsuariosBulk,
+    ErrorBulk,
+    ResultadoBulk,
+    UsuarioConEstado,
+    modelo_usuario_parcial
+)
+from importacion import Importacion
+from compresion import CompresionMiddleware
+from cache_membresia import cache_estado_membresia
 from database import (
     crear_usuario,
+    crear_usuarios_bulk,
     obtener_usuario,
-    obtener_todos_usuarios,
+    obtener_usuario_campos,
+    obtener_usuarios_por_codigo,
+    obtener_usuarios_por_documento,
+    obtener_todos_usuarios_json,
+    obtener_pagina_usuarios,
+    buscar_usuarios_texto,
+    parsear_campos,
+    abrir_exportacion,
+    abrir_por_vencer,
+    codificar_cursor_vencimiento,
     actualizar_usuario,
     eliminar_usuario,
-    inicializar_bd
+    actualizar_usuarios_bulk,
+    eliminar_usuarios_bulk,
+    obtener_estados_membresia,
+    obtener_estado_membresia,
+    obtener_estadisticas_membresia,
+    avanzar_dia_estadisticas,
+    inicializar_bd,
+    ejecutar_bd,
+    cerrar_conexiones,
+    estadisticas_pool,
+    estadisticas_cache_membresia,
+    estadisticas_snapshot,
+    version_esquema,
+    version_usuarios_json
 )
 
+logger = logging.getLogger(__name__)
+
 # Inicializar la aplicación FastAPI
 app = FastAPI(
     title="API CRUD Gimnasio",
@@ -28,10 +80,79 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos los headers
 )
 
+# Comprimir las respuestas grandes con brotli o gzip (ver compresion.py)
+app.add_middleware(CompresionMiddleware)
+
+# Máximo de elementos por petición en los endpoints /usuarios/bulk
+MAX_ELEMENTOS_BULK = 50000
+
+# Máximo de IDs por consulta de estados de membresía
+MAX_IDS_ESTADO = 1000
+
+# Filas leídas de SQLite por cada bloque de la exportación
+FILAS_POR_BLOQUE_EXPORTACION = 1000
+
+# Progreso de la última importación (para GET /usuarios/import/estado)
+ultima_importacion: Optional[Importacion] = None
+
+# Las importaciones se hacen de a una: la siguiente espera a que termine la anterior,
+# así ultima_importacion siempre es la que está insertando
+lock_importacion = asyncio.Lock()
+
+# Las respuestas con ETag se pueden guardar, pero el navegador debe revalidarlas siempre
+CACHE_CONTROL_ETAG = "no-cache"
+
+def calcular_etag(*partes: Any) -> str:
+    """ETag fuerte: hash corto de los valores que determinan la respuesta"""
+    return '"' + hashlib.blake2b(repr(partes).encode(), digest_size=8).hexdigest() + '"'
+
+def etag_coincide(request: Request, etag: str) -> bool:
+    """Indicar si el cliente ya tiene esta versión (encabezado If-None-Match)"""
+    encabezado = request.headers.get("if-none-match")
+    if not encabezado:
+        return False
+    if encabezado.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    return any(valor.strip().removeprefix("W/") == etag for valor in encabezado.split(","))
+
+def no_modificado(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL_ETAG})
+
+def agregar_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL_ETAG
+
+# Tarea que pasa los contadores de membresías al día siguiente a la medianoche
+tarea_cambio_de_dia: Optional[asyncio.Task] = None
+
+async def cambio_de_dia():
+    """Cada medianoche (hora local) descontar de membresia_stats las membresías que vencieron"""
+    while True:
+        ahora = datetime.now()
+        medianoche = datetime.combine(ahora.date() + timedelta(days=1), time.min)
+        await asyncio.sleep((medianoche - ahora).total_seconds() + 1)
+        try:
+            vencidas = await ejecutar_bd(avanzar_dia_estadisticas)
+            print(f"📅 Cambio de día: {vencidas} membresías vencidas")
+        except Exception:
+            # GET /estadisticas vuelve a intentarlo si encuentra el día atrasado
+            logger.exception("Error al pasar los contadores de membresías al día siguiente")
+
 # Inicializar la base de datos al iniciar la aplicación
 @app.on_event("startup")
 async def startup_event():
-    inicializar_bd()
+    global tarea_cambio_de_dia
+    await ejecutar_bd(inicializar_bd)
+    tarea_cambio_de_dia = asyncio.create_task(cambio_de_dia())
+
+# Cerrar las conexiones del pool al detener la aplicación
+@app.on_event("shutdown")
+async def shutdown_event():
+    if tarea_cambio_de_dia is not None:
+        tarea_cambio_de_dia.cancel()
+    cerrar_conexiones()
 
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -60,67 +181,361 @@ async def crear_nuevo_usuario(usuario: UsuarioCreate):
     - **numero_documento**: Número de documento (opcional)
     """
     try:
-        usuario_id = crear_usuario(usuario)
-        usuario_creado = obtener_usuario(usuario_id)
-        if not usuario_creado:
-            raise HTTPException(status_code=500, detail="Error al crear el usuario")
-        return usuario_creado
+        return await ejecutar_bd(crear_usuario, usuario)
+    except sqlite3.IntegrityError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Código o documento repetido: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def leer_elementos_bulk(request: Request) -> List[Any]:
+    """
+    Leer el cuerpo de una petición masiva: un arreglo JSON o NDJSON
+    (un objeto JSON por línea, con Content-Type application/x-ndjson).
+    """
+    cuerpo = await request.body()
+    tipo = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in tipo or "jsonlines" in tipo:
+            elementos = [json.loads(linea) for linea in cuerpo.splitlines() if linea.strip()]
+        else:
+            elementos = json.loads(cuerpo)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"JSON inválido: {e}")
+    
+    if not isinstance(elementos, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Se esperaba un arreglo de elementos")
+    if len(elementos) > MAX_ELEMENTOS_BULK:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {MAX_ELEMENTOS_BULK} elementos por solicitud. Recibidos: {len(elementos)}"
+        )
+    return elementos
+
+def validar_elementos_bulk(elementos: List[Any], modelo: Type[BaseModel]) -> Tuple[List[Tuple[int, Any]], List[ErrorBulk]]:
+    """Validar cada elemento por separado; los inválidos se reportan sin detener al resto"""
+    validos = []
+    errores = []
+    for indice, elemento in enumerate(elementos):
+        try:
+            validos.append((indice, modelo.model_validate(elemento)))
+        except ValidationError as e:
+            mensaje = ", ".join(f"{'.'.join(str(parte) for parte in err['loc'])} - {err['msg']}" for err in e.errors())
+            id_elemento = elemento.get("id") if isinstance(elemento, dict) else None
+            errores.append(ErrorBulk(indice=indice, id=id_elemento if isinstance(id_elemento, int) else None, error=mensaje))
+    return validos, errores
+
+# CREATE - Crear muchos usuarios en una sola transacción
+@app.post("/usuarios/bulk", response_model=ResultadoBulk, tags=["Usuarios"])
+async def crear_usuarios_masivo(request: Request):
+    """
+    Crear muchos usuarios en una sola transacción.
+    
+    El cuerpo es un arreglo JSON de usuarios (mismos campos que `POST /usuarios`) o NDJSON
+    con `Content-Type: application/x-ndjson`. Los elementos inválidos se reportan en `errores`
+    con su posición y el resto se crea igual.
+    """
+    elementos = await leer_elementos_bulk(request)
+    validos, errores = validar_elementos_bulk(elementos, UsuarioCreate)
+    
+    try:
+        ids, errores_bd = await ejecutar_bd(crear_usuarios_bulk, [usuario for _, usuario in validos])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    creados = [usuario_id for usuario_id in ids if usuario_id is not None]
+    for posicion, mensaje in errores_bd.items():
+        errores.append(ErrorBulk(indice=validos[posicion][0], error=mensaje))
+    
+    errores.sort(key=lambda error: error.indice)
+    return ResultadoBulk(procesados=len(creados), ids=creados, errores=errores)
+
+# UPDATE - Actualizar muchos usuarios en una sola transacción
+@app.put("/usuarios/bulk", response_model=ResultadoBulk, tags=["Usuarios"])
+async def actualizar_usuarios_masivo(request: Request):
+    """
+    Actualizar muchos usuarios en una sola transacción.
+    
+    El cuerpo es un arreglo JSON (o NDJSON) de objetos con `id` y los campos a modificar,
+    igual que `PUT /usuarios/{usuario_id}`. Los IDs inexistentes se reportan en `errores`.
+    """
+    elementos = await leer_elementos_bulk(request)
+    validos, errores = validar_elementos_bulk(elementos, UsuarioUpdateBulk)
+    
+    try:
+        errores_bd = await ejecutar_bd(actualizar_usuarios_bulk, [usuario for _, usuario in validos])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    actualizados = []
+    for posicion, (indice, usuario) in enumerate(validos):
+        if posicion in errores_bd:
+            errores.append(ErrorBulk(indice=indice, id=usuario.id, error=errores_bd[posicion]))
+        else:
+            actualizados.append(usuario.id)
+    
+    errores.sort(key=lambda error: error.indice)
+    return ResultadoBulk(procesados=len(actualizados), ids=actualizados, errores=errores)
+
+# DELETE - Eliminar muchos usuarios en una sola transacción
+@app.delete("/usuarios/bulk", response_model=ResultadoBulk, tags=["Usuarios"])
+async def eliminar_usuarios_masivo(peticion: EliminarUsuariosBulk):
+    """
+    Eliminar muchos usuarios en una sola transacción.
+    Los IDs inexistentes se reportan en `errores`.
+    """
+    if len(peticion.ids) > MAX_ELEMENTOS_BULK:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {MAX_ELEMENTOS_BULK} elementos por solicitud. Recibidos: {len(peticion.ids)}"
+        )
+    
+    try:
+        inexistentes = set(await ejecutar_bd(eliminar_usuarios_bulk, peticion.ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    eliminados = [usuario_id for usuario_id in dict.fromkeys(peticion.ids) if usuario_id not in inexistentes]
+    errores = [
+        ErrorBulk(indice=indice, id=usuario_id, error=f"Usuario con ID {usuario_id} no encontrado")
+        for indice, usuario_id in enumerate(peticion.ids)
+        if usuario_id in inexistentes
+    ]
+    return ResultadoBulk(procesados=len(eliminados), ids=eliminados, errores=errores)
+
+# CREATE - Importar usuarios desde un archivo CSV o NDJSON
+@app.post("/usuarios/import", tags=["Usuarios"])
+async def importar_usuarios(request: Request, format: Literal["csv", "ndjson"] = "csv"):
+    """
+    Importar usuarios desde un archivo enviado como cuerpo de la petición.
+    - **format**: `csv` (con encabezado) o `ndjson` (un objeto JSON por línea)
+    
+    El archivo se procesa a medida que llega y se inserta en lotes de 1.000 usuarios
+    (un commit por lote), así que nunca se carga completo en memoria. Las fechas se
+    normalizan igual que en `migrar_a_sqlite.py`. El progreso se consulta en
+    `GET /usuarios/import/estado`. Si ya hay una importación en curso, esta espera
+    a que termine.
+    """
+    global ultima_importacion
+    async with lock_importacion:
+        importacion = Importacion(format)
+        ultima_importacion = importacion
+    
+        try:
+            # El parseo, la validación y la inserción de cada bloque corren en los hilos de la
+            # base de datos; el event loop solo recibe los bloques
+            async for bloque in request.stream():
+                await ejecutar_bd(importacion.procesar, bloque)
+            await ejecutar_bd(importacion.procesar, b"", True)
+        except UnicodeDecodeError:
+            importacion.terminar("error")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo debe estar codificado en UTF-8")
+        except Exception as e:
+            importacion.terminar("error")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+        importacion.terminar()
+        return importacion.resumen()
+
+# Progreso de la última importación
+@app.get("/usuarios/import/estado", tags=["Usuarios"])
+async def estado_importacion():
+    """
+    Progreso de la importación en curso o de la última importación realizada.
+    """
+    if ultima_importacion is None:
+        return {"estado": "sin_importaciones"}
+    return ultima_importacion.resumen()
+
 # READ - Obtener todos los usuarios
 @app.get("/usuarios", response_model=List[Usuario], tags=["Usuarios"])
 async def listar_usuarios(
+    request: Request,
     skip: int = 0,
     limit: int = 10000,
-    departamento: Optional[str] = None
+    departamento: Optional[str] = None,
+    fields: Optional[str] = None
 ):
     """
     Obtener lista de todos los usuarios.
+    Para tablas grandes es preferible `/usuarios/pagina` (paginación por cursor).
     - **skip**: Número de registros a omitir (para paginación)
     - **limit**: Número máximo de registros a devolver
     - **departamento**: Filtrar por departamento (opcional)
+    - **fields**: Campos a incluir separados por coma, p. ej. `id,nombre,apellido,fecha_fin` (opcional)
+    
+    La respuesta incluye un `ETag` basado en el contador de cambios de la tabla:
+    con `If-None-Match` y sin cambios se responde `304 Not Modified` sin consultar la lista.
+    
+    El JSON lo genera SQLite y se envía tal cual (sin volver a validar cada usuario).
+    """
+    try:
+        campos = parsear_campos(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    try:
+        # Con el snapshot la versión y la lista se leen juntas; sin él la versión se lee antes
+        # que la lista: si cambia en medio, el ETag queda viejo y la próxima petición
+        # simplemente recibe la lista completa
+        version, contenido = await ejecutar_bd(version_usuarios_json, skip, limit, departamento, campos)
+        etag = calcular_etag("usuarios", version, skip, limit, departamento, campos)
+        if etag_coincide(request, etag):
+            return no_modificado(etag)
+        if contenido is None:
+            contenido = await ejecutar_bd(obtener_todos_usuarios_json, skip, limit, departamento, campos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    respuesta = Response(content=contenido, media_type="application/json")
+    agregar_etag(respuesta, etag)
+    return respuesta
+
+# READ - Obtener usuarios paginados por cursor
+# (debe declararse antes de /usuarios/{usuario_id} para que "pagina" no se tome como ID)
+@app.get("/usuarios/pagina", response_model=PaginaUsuarios, tags=["Usuarios"])
+async def listar_usuarios_pagina(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    departamento: Optional[str] = None
+):
+    """
+    Obtener usuarios ordenados por ID con paginación por cursor.
+    - **cursor**: Valor de `next_cursor` de la respuesta anterior (omitir en la primera página)
+    - **limit**: Tamaño de la página (1-500)
+    - **departamento**: Filtrar por departamento (opcional)
+    
+    El costo de cada página es constante, sin importar qué tan profunda sea.
+    """
+    try:
+        usuarios, next_cursor = await ejecutar_bd(obtener_pagina_usuarios, cursor, limit, departamento)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return PaginaUsuarios(usuarios=usuarios, next_cursor=next_cursor)
+
+# READ - Exportar usuarios en streaming (NDJSON o CSV)
+@app.get("/usuarios/export", tags=["Usuarios"])
+async def exportar_usuarios(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    departamento: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """
+    Exportar todos los usuarios sin cargarlos en memoria.
+    - **format**: `ndjson` (un objeto JSON por línea) o `csv`
+    - **departamento**: Filtrar por departamento (opcional)
+    - **fields**: Columnas a incluir separadas por coma, p. ej. `nombre,apellido,fecha_fin` (opcional)
+    
+    Las filas se leen del cursor de SQLite en bloques y se envían a medida que se generan,
+    así que la memoria usada no depende del tamaño de la tabla.
     """
     try:
-        usuarios = obtener_todos_usuarios(skip, limit, departamento)
-        return usuarios
+        campos = parsear_campos(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    try:
+        cursor = await ejecutar_bd(abrir_exportacion, campos, departamento)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def generar_bloques() -> AsyncIterator[str]:
+        """Leer el cursor bloque a bloque en los hilos de la base de datos y formatear cada bloque"""
+        try:
+            if format == "csv":
+                salida = io.StringIO()
+                escritor = csv.writer(salida)
+                escritor.writerow(campos)
+                yield salida.getvalue()
+            
+            while True:
+                filas = await ejecutar_bd(cursor.fetchmany, FILAS_POR_BLOQUE_EXPORTACION)
+                if not filas:
+                    break
+                if format == "csv":
+                    salida = io.StringIO()
+                    csv.writer(salida).writerows(filas)
+                    yield salida.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps(dict(zip(campos, fila)), ensure_ascii=False) + "\n" for fila in filas
+                    )
+        finally:
+            cursor.connection.close()
+    
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generar_bloques(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="usuarios.{format}"'}
+    )
 
 # READ - Obtener un usuario específico por ID
 @app.get("/usuarios/{usuario_id}", response_model=Usuario, tags=["Usuarios"])
-async def obtener_usuario_por_id(usuario_id: int):
+async def obtener_usuario_por_id(usuario_id: int, request: Request, response: Response, fields: Optional[str] = None):
     """
     Obtener un usuario específico por su ID.
+    - **fields**: Campos a incluir separados por coma, p. ej. `nombre,apellido,fecha_fin` (opcional)
+    
+    Admite `If-None-Match` con el `ETag` de una respuesta anterior (304 si no cambió).
     """
-    usuario = obtener_usuario(usuario_id)
+    if fields:
+        return await obtener_usuario_parcial(usuario_id, fields, request)
+    
+    usuario = await ejecutar_bd(obtener_usuario, usuario_id)
     if usuario is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Usuario con ID {usuario_id} no encontrado"
         )
+    etag = calcular_etag(tuple(usuario.model_dump().values()))
+    if etag_coincide(request, etag):
+        return no_modificado(etag)
+    agregar_etag(response, etag)
     return usuario
 
+async def obtener_usuario_parcial(usuario_id: int, fields: str, request: Request) -> Response:
+    """Leer solo las columnas pedidas y responder con el modelo liviano correspondiente"""
+    try:
+        campos = parsear_campos(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    datos = await ejecutar_bd(obtener_usuario_campos, usuario_id, campos)
+    if datos is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {usuario_id} no encontrado"
+        )
+    etag = calcular_etag(tuple(campos), tuple(datos.values()))
+    if etag_coincide(request, etag):
+        return no_modificado(etag)
+    
+    usuario = modelo_usuario_parcial(tuple(campos))(**datos)
+    respuesta = Response(content=usuario.model_dump_json(), media_type="application/json")
+    agregar_etag(respuesta, etag)
+    return respuesta
+
 # UPDATE - Actualizar un usuario existente
 @app.put("/usuarios/{usuario_id}", response_model=Usuario, tags=["Usuarios"])
 async def actualizar_usuario_por_id(usuario_id: int, usuario: UsuarioUpdate):
     """
     Actualizar un usuario existente. Solo se actualizan los campos proporcionados.
     """
-    # Verificar que el usuario existe
-    usuario_existente = obtener_usuario(usuario_id)
-    if usuario_existente is None:
+    try:
+        usuario_actualizado = await ejecutar_bd(actualizar_usuario, usuario_id, usuario)
+    except sqlite3.IntegrityError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Código o documento repetido: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Si el UPDATE no afectó ninguna fila el usuario no existe
+    if usuario_actualizado is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Usuario con ID {usuario_id} no encontrado"
         )
-    
-    try:
-        actualizar_usuario(usuario_id, usuario)
-        usuario_actualizado = obtener_usuario(usuario_id)
-        return usuario_actualizado
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return usuario_actualizado
 
 # DELETE - Eliminar un usuario
 @app.delete("/usuarios/{usuario_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Usuarios"])
@@ -128,86 +543,251 @@ async def eliminar_usuario_por_id(usuario_id: int):
     """
     Eliminar un usuario por su ID.
     """
-    # Verificar que el usuario existe
-    usuario_existente = obtener_usuario(usuario_id)
-    if usuario_existente is None:
+    try:
+        eliminado = await ejecutar_bd(eliminar_usuario, usuario_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Si el DELETE no afectó ninguna fila el usuario no existe
+    if not eliminado:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Usuario con ID {usuario_id} no encontrado"
         )
-    
-    try:
-        eliminar_usuario(usuario_id)
-        return None
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return None
 
 # Endpoint adicional para búsqueda
 @app.get("/usuarios/buscar/{termino}", response_model=List[Usuario], tags=["Usuarios"])
-async def buscar_usuarios(termino: str):
+async def buscar_usuarios(termino: str, limit: int = Query(50, ge=1, le=500)):
     """
     Buscar usuarios por nombre, apellido o código.
+    - **termino**: Una o más palabras; cada una se busca como prefijo y sin distinguir tildes
+      ("perez" encuentra "Pérez")
+    - **limit**: Número máximo de resultados, ordenados por relevancia
+    """
+    try:
+        return await ejecutar_bd(buscar_usuarios_texto, termino, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def usuario_unico(usuarios: List[UsuarioConEstado], descripcion: str) -> UsuarioConEstado:
+    """El único usuario encontrado; 404 si no hay ninguno y 409 si el valor está repetido"""
+    if not usuarios:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Usuario con {descripcion} no encontrado")
+    if len(usuarios) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Hay más de un usuario con {descripcion}; corrija los datos repetidos"
+        )
+    return usuarios[0]
+
+# Búsqueda exacta por código (check-in en el kiosco)
+@app.get("/usuarios/codigo/{codigo}", response_model=UsuarioConEstado, tags=["Usuarios"])
+async def obtener_usuario_por_codigo(codigo: str):
+    """
+    Obtener un usuario por su código, junto con el estado de su membresía.
+    Usa el índice único de código: una sola consulta, sin recorrer la tabla.
+    """
+    try:
+        usuarios = await ejecutar_bd(obtener_usuarios_por_codigo, codigo)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return usuario_unico(usuarios, f"código {codigo}")
+
+# Búsqueda exacta por documento (check-in en el kiosco)
+@app.get("/usuarios/documento/{tipo_documento}/{numero_documento}", response_model=UsuarioConEstado, tags=["Usuarios"])
+async def obtener_usuario_por_documento(tipo_documento: str, numero_documento: str):
+    """
+    Obtener un usuario por tipo y número de documento, junto con el estado de su membresía.
+    Usa el índice único de documento: una sola consulta, sin recorrer la tabla.
+    """
+    try:
+        usuarios = await ejecutar_bd(obtener_usuarios_por_documento, tipo_documento, numero_documento)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return usuario_unico(usuarios, f"documento {tipo_documento} {numero_documento}")
+
+# Membresías que vencen pronto (para que recepción llame a los socios)
+@app.get("/membresia/por-vencer", tags=["Membresía"])
+async def membresias_por_vencer(
+    dias: int = Query(7, ge=0, le=366),
+    departamento: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    Membresías vigentes que vencen en los próximos `dias` días, ordenadas por fecha de fin.
+    - **dias**: Ventana en días (0-366)
+    - **departamento**: Filtrar por departamento (opcional)
+    - **cursor**: Valor de `next_cursor` de la respuesta anterior (omitir en la primera página)
+    - **limit**: Tamaño de la página (1-5000)
+    
+    Devuelve `{"usuarios": [...], "next_cursor": ...}`; cada usuario incluye `dias_restantes`.
+    La consulta recorre solo el tramo del índice de fecha de fin que corresponde y las filas
+    se envían a medida que se leen.
     """
     try:
-        usuarios = obtener_todos_usuarios()
-        resultados = [
-            u for u in usuarios
-            if termino.lower() in u.nombre.lower() or
-               termino.lower() in u.apellido.lower() or
-               (u.codigo and termino.lower() in u.codigo.lower())
-        ]
-        return resultados
+        filas_cursor = await ejecutar_bd(abrir_por_vencer, dias, departamento, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def generar() -> AsyncIterator[str]:
+        enviadas = 0
+        ultima = None
+        hay_mas = False
+        try:
+            yield '{"usuarios":['
+            while not hay_mas:
+                filas = await ejecutar_bd(filas_cursor.fetchmany, FILAS_POR_BLOQUE_EXPORTACION)
+                if not filas:
+                    break
+                if enviadas + len(filas) > limit:
+                    # La fila extra (limit + 1) solo indica que hay otra página
+                    filas = filas[:limit - enviadas]
+                    hay_mas = True
+                if filas:
+                    yield ("," if enviadas else "") + ",".join(fila[0] for fila in filas)
+                    enviadas += len(filas)
+                    ultima = filas[-1]
+        finally:
+            filas_cursor.connection.close()
+        next_cursor = codificar_cursor_vencimiento(ultima[1], ultima[2]) if hay_mas else None
+        yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
+    
+    return StreamingResponse(generar(), media_type="application/json")
 
 # Endpoint para verificar estado de membresía
 @app.get("/membresia/estado/{usuario_id}", response_model=EstadoMembresia, tags=["Membresía"])
-async def verificar_estado_membresia(usuario_id: int):
+async def verificar_estado_membresia(usuario_id: int, request: Request, response: Response):
     """
     Verificar el estado de membresía de un usuario por su ID.
     
     - **usuario_id**: ID del usuario
     
     Devuelve la fecha de inicio, fecha de fin y el estado de la membresía:
-    - **VALIDO**: La membresía está activa (fecha actual <= fecha fin)
-    - **VENCIDO**: La membresía ha expirado (fecha actual > fecha fin)
+    - **VALIDO**: La membresía está activa (fecha actual < fecha fin)
+    - **VENCIDO**: La membresía ha expirado (fecha actual >= fecha fin)
+    
+    El estado se calcula en SQLite comparando el número de día de hoy con la columna fin_dia.
+    
+    Los estados se guardan en una caché en memoria que se invalida al actualizar o
+    eliminar el usuario y se vacía a la medianoche. Admite `If-None-Match` (304 si no cambió).
     """
+    estado_en_cache = cache_estado_membresia.obtener(usuario_id)
+    if estado_en_cache is not None:
+        return responder_estado(estado_en_cache, request, response)
+    version_cache = cache_estado_membresia.version()
+    
     try:
-        # Buscar el usuario por ID
-        usuario_encontrado = obtener_usuario(usuario_id)
+        # Buscar el usuario y calcular su estado en la misma consulta
+        estado_membresia = await ejecutar_bd(obtener_estado_membresia, usuario_id)
         
-        if not usuario_encontrado:
+        if not estado_membresia:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Usuario con ID {usuario_id} no encontrado"
             )
         
-        # Obtener la fecha actual
-        fecha_actual = datetime.now().date()
-        
-        # Convertir fecha_fin a objeto date para comparar
-        try:
-            fecha_fin = datetime.strptime(usuario_encontrado.fecha_fin, '%Y-%m-%d').date()
-        except ValueError:
-            raise HTTPException(
-                status_code=500,
-                detail="Formato de fecha inválido en la base de datos"
-            )
-        
-        # Determinar el estado de la membresía
-        # La membresía es válida si la fecha actual es MENOR que la fecha de fin
-        # (la fecha de fin es el primer día NO válido)
-        estado = "VALIDO" if fecha_actual < fecha_fin else "VENCIDO"
-        
-        return EstadoMembresia(
-            nombre=usuario_encontrado.nombre,
-            apellido=usuario_encontrado.apellido,
-            fecha_inicio=usuario_encontrado.fecha_inicio,
-            fecha_fin=usuario_encontrado.fecha_fin,
-            estado=estado
-        )
+        cache_estado_membresia.guardar(usuario_id, estado_membresia, version_cache)
+        return responder_estado(estado_membresia, request, response)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def responder_estado(estado_membresia: EstadoMembresia, request: Request, response: Response):
+    """Devolver el estado o un 304 si el cliente ya lo tiene (el ETag cambia también con el estado del día)"""
+    etag = calcular_etag(tuple(estado_membresia.model_dump().values()))
+    if etag_coincide(request, etag):
+        return no_modificado(etag)
+    agregar_etag(response, etag)
+    return estado_membresia
+
+async def consultar_estados_membresia(ids: List[int]) -> EstadosMembresia:
+    """Resolver el estado de membresía de varios usuarios en una sola consulta"""
+    if len(ids) > MAX_IDS_ESTADO:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {MAX_IDS_ESTADO} IDs por solicitud. Recibidos: {len(ids)}"
+        )
+    try:
+        estados = await ejecutar_bd(obtener_estados_membresia, ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    no_encontrados = [usuario_id for usuario_id in dict.fromkeys(ids) if usuario_id not in estados]
+    return EstadosMembresia(estados=estados, no_encontrados=no_encontrados)
+
+# Endpoints para verificar el estado de membresía de varios usuarios (torniquetes, reconocimiento facial)
+@app.post("/membresia/estado", response_model=EstadosMembresia, tags=["Membresía"])
+async def verificar_estados_membresia(consulta: ConsultaEstadosMembresia):
+    """
+    Verificar el estado de membresía de varios usuarios a la vez.
+    
+    - **ids**: IDs de los usuarios (máximo 1000)
+    
+    Devuelve un mapa ID -> `VALIDO`/`VENCIDO` calculado en SQLite con la fecha de hoy,
+    y la lista de IDs que no existen.
+    """
+    return await consultar_estados_membresia(consulta.ids)
+
+@app.get("/membresia/estado", response_model=EstadosMembresia, tags=["Membresía"])
+async def verificar_estados_membresia_get(ids: str = Query(..., description="IDs separados por coma, p. ej. 1,2,3")):
+    """
+    Igual que `POST /membresia/estado`, con los IDs en la URL: `?ids=1,2,3`.
+    """
+    try:
+        lista_ids = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids debe ser una lista de números separados por coma")
+    return await consultar_estados_membresia(lista_ids)
+
+# Panel de recepción: miembros activos por departamento
+@app.get("/estadisticas", response_model=EstadisticasMembresia, tags=["Membresía"])
+async def estadisticas_membresia():
+    """
+    Total de usuarios, membresías activas y vencidas, en total y por departamento.
+    
+    Los contadores los mantienen triggers de SQLite en la tabla `membresia_stats`, así que
+    la respuesta no depende de la cantidad de usuarios. Para verificarlos o reconstruirlos:
+    `python estadisticas.py ../gimnasio.db`.
+    """
+    try:
+        return await ejecutar_bd(obtener_estadisticas_membresia)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Endpoint de diagnóstico del pool de conexiones
+@app.get("/sistema/pool", tags=["Sistema"])
+async def estado_pool():
+    """
+    Estadísticas del pool de conexiones SQLite (conexiones abiertas, reutilizaciones y pragmas).
+    """
+    return estadisticas_pool()
+
+# Endpoint de diagnóstico de la caché de estados de membresía
+@app.get("/sistema/cache", tags=["Sistema"])
+async def estado_cache():
+    """
+    Estadísticas de la caché de `/membresia/estado/{usuario_id}` (aciertos, fallos, desalojos, invalidaciones).
+    """
+    return estadisticas_cache_membresia()
+
+# Endpoint de diagnóstico de la copia en memoria de usuarios
+@app.get("/sistema/snapshot", tags=["Sistema"])
+async def estado_snapshot():
+    """
+    Tamaño y versión del snapshot de usuarios en memoria (activo con `USUARIOS_EN_MEMORIA=1`).
+    La versión aumenta con cada escritura aplicada.
+    """
+    return estadisticas_snapshot()
+
+# Endpoint de diagnóstico del esquema de la base de datos
+@app.get("/sistema/esquema", tags=["Sistema"])
+async def estado_esquema():
+    """
+    Versión del esquema aplicada por las migraciones.
+    """
+    return {"version": await ejecutar_bd(version_esquema)}
@@ -0,0 +1,324 @@
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Union
+
+import estadisticas
+from fechas import dia_actual, normalizar_fecha
+
+
+class Migracion(NamedTuple):
+    """Una migración del esquema: lista de sentencias SQL o función que recibe la conexión"""
+    version: int
+    descripcion: str
+    pasos: Union[List[str], Callable[[sqlite3.Connection], None]]
+
+
+def _indices_unicos_identificacion(conexion: sqlite3.Connection):
+    """
+    Índices únicos para buscar por código y por documento (tipo + número).
+
+    Los valores vacíos pasan a NULL (SQLite permite varios NULL en un índice único).
+    Si ya hay valores repetidos, el usuario más antiguo (menor ID) conserva el valor y en
+    los demás queda NULL. Los valores quitados se guardan en usuarios_identificacion_repetida
+    y se avisa, para revisarlos y corregirlos a mano sin que la API deje de arrancar.
+    """
+    for columna in ("codigo", "numero_documento"):
+        # Solo las filas que cambian (IS NOT compara también contra NULL)
+        conexion.execute(
+            f"UPDATE usuarios SET {columna} = NULLIF(TRIM({columna}), '') "
+            f"WHERE {columna} IS NOT NULLIF(TRIM({columna}), '')"
+        )
+
+    conexion.execute("""
+    CREATE TABLE IF NOT EXISTS usuarios_identificacion_repetida (
+        usuario_id INTEGER NOT NULL,
+        columna TEXT NOT NULL,
+        valor TEXT NOT NULL,
+        conservado_por INTEGER NOT NULL
+    )
+    """)
+
+    indices = [
+        ("idx_usuarios_codigo_unico", "idx_usuarios_codigo", ["codigo"]),
+        # numero_documento primero: el índice también sirve para buscar solo por número
+        ("idx_usuarios_documento_unico", "idx_usuarios_numero_documento", ["numero_documento", "tipo_documento"]),
+    ]
+    for nombre, reemplazado, columnas in indices:
+        columna = columnas[0]
+        # Filas con los mismos valores que otra de ID menor (= no empareja NULL, igual que el índice)
+        repetidos = conexion.execute(f"""
+        SELECT u.id, u.{columna}, MIN(o.id) FROM usuarios u
+        JOIN usuarios o ON o.id < u.id AND {' AND '.join(f'o.{c} = u.{c}' for c in columnas)}
+        GROUP BY u.id
+        """).fetchall()
+        if repetidos:
+            conexion.executemany(
+                "INSERT INTO usuarios_identificacion_repetida (usuario_id, columna, valor, conservado_por) VALUES (?, ?, ?, ?)",
+                [(usuario_id, columna, valor, conservado_por) for usuario_id, valor, conservado_por in repetidos]
+            )
+            conexion.executemany(f"UPDATE usuarios SET {columna} = NULL WHERE id = ?", [(fila[0],) for fila in repetidos])
+            print(
+                f"⚠️  {len(repetidos)} valores de {columna} repetidos quedaron en NULL "
+                f"(IDs: {[fila[0] for fila in repetidos[:10]]}); los originales están en usuarios_identificacion_repetida"
+            )
+
+        conexion.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {nombre} ON usuarios({', '.join(columnas)})")
+        conexion.execute(f"DROP INDEX IF EXISTS {reemplazado}")
+
+
+# Texto que ya tiene la forma YYYY-MM-DD (las filas que no la tienen se normalizan)
+PATRON_FECHA = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+
+def _fechas_como_dias(conexion: sqlite3.Connection):
+    """
+    Fechas de usuarios en YYYY-MM-DD y columnas generadas para comparar fechas como enteros.
+
+    migrar_a_sqlite.py guardaba las fechas con hora ("2025-12-31 00:00:00") y la API
+    aceptaba cualquier texto. Las fechas con otro formato pasan a YYYY-MM-DD; las que no
+    se pueden interpretar se dejan como están y se avisa (sus columnas de día quedan en NULL).
+
+    - fin_dia: días desde 1970-01-01 de fecha_fin (estado y vencimientos)
+    - nacimiento_mmdd: mes * 100 + día de fecha_nacimiento (cumpleaños)
+
+    Son columnas VIRTUAL: no ocupan espacio en la tabla, solo en sus índices.
+    """
+    for columna in ("fecha_nacimiento", "fecha_inicio", "fecha_fin"):
+        rows = conexion.execute(
+            f"SELECT id, {columna} FROM usuarios WHERE {columna} IS NOT NULL AND {columna} NOT GLOB ?",
+            (PATRON_FECHA,)
+        ).fetchall()
+        cambios = []
+        invalidas = []
+        for usuario_id, valor in rows:
+            normalizada = normalizar_fecha(valor)
+            if normalizada is not None:
+                cambios.append((normalizada, usuario_id))
+            elif columna == "fecha_nacimiento" and not str(valor).strip():
+                cambios.append((None, usuario_id))  # Texto vacío: sin fecha de nacimiento
+            else:
+                invalidas.append(usuario_id)
+        conexion.executemany(f"UPDATE usuarios SET {columna} = ? WHERE id = ?", cambios)
+        if invalidas:
+            print(f"⚠️  {len(invalidas)} valores de {columna} no son fechas y se dejaron igual (IDs: {invalidas[:10]})")
+
+    conexion.execute(
+        "ALTER TABLE usuarios ADD COLUMN fin_dia INTEGER "
+        "GENERATED ALWAYS AS (CAST(julianday(fecha_fin) - 2440587.5 AS INTEGER)) VIRTUAL"
+    )
+    conexion.execute(
+        "ALTER TABLE usuarios ADD COLUMN nacimiento_mmdd INTEGER "
+        "GENERATED ALWAYS AS (CAST(strftime('%m%d', fecha_nacimiento) AS INTEGER)) VIRTUAL"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_fin_dia ON usuarios(fin_dia)")
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_departamento_fin_dia ON usuarios(departamento, fin_dia)")
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_nacimiento_mmdd ON usuarios(nacimiento_mmdd)")
+    # Las consultas por fecha de fin usan ahora fin_dia
+    conexion.execute("DROP INDEX IF EXISTS idx_usuarios_fecha_fin")
+    conexion.execute("DROP INDEX IF EXISTS idx_usuarios_departamento_fecha_fin")
+
+
+# Pasos de los triggers de membresia_stats: quitar la fila vieja y sumar la nueva
+_SQL_RESTAR_STATS = """
+    UPDATE membresia_stats SET
+        total = total - 1,
+        activos = activos - IFNULL(old.fin_dia > (SELECT dia FROM membresia_stats_dia WHERE id = 1), 0)
+    WHERE departamento = old.departamento;
+    DELETE FROM membresia_stats WHERE departamento = old.departamento AND total = 0;
+"""
+_SQL_SUMAR_STATS = """
+    INSERT INTO membresia_stats (departamento, total, activos)
+    VALUES (new.departamento, 1, IFNULL(new.fin_dia > (SELECT dia FROM membresia_stats_dia WHERE id = 1), 0))
+    ON CONFLICT (departamento) DO UPDATE SET total = total + 1, activos = activos + excluded.activos;
+"""
+
+
+def _contadores_membresia(conexion: sqlite3.Connection):
+    """
+    Contadores de membresías por departamento mantenidos por triggers (ver estadisticas.py).
+    Se llenan con un conteo completo para el día de hoy.
+    """
+    conexion.execute("""
+    CREATE TABLE IF NOT EXISTS membresia_stats (
+        departamento TEXT PRIMARY KEY,
+        total INTEGER NOT NULL,
+        activos INTEGER NOT NULL
+    )
+    """)
+    # Día al que corresponden los activos (activa si fin_dia > dia)
+    conexion.execute("""
+    CREATE TABLE IF NOT EXISTS membresia_stats_dia (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        dia INTEGER NOT NULL
+    )
+    """)
+    conexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS membresia_stats_ai AFTER INSERT ON usuarios BEGIN
+        {_SQL_SUMAR_STATS}
+    END
+    """)
+    conexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS membresia_stats_ad AFTER DELETE ON usuarios BEGIN
+        {_SQL_RESTAR_STATS}
+    END
+    """)
+    # Solo cuando cambia algo que afecta los contadores
+    conexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS membresia_stats_au AFTER UPDATE OF departamento, fecha_fin ON usuarios
+    WHEN old.departamento IS NOT new.departamento OR old.fin_dia IS NOT new.fin_dia BEGIN
+        {_SQL_RESTAR_STATS}
+        {_SQL_SUMAR_STATS}
+    END
+    """)
+    estadisticas.reconstruir(conexion, dia_actual())
+
+
+# Migraciones en orden. Nunca modificar una migración ya publicada: agregar una nueva.
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Índices secundarios de usuarios", [
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_departamento ON usuarios(departamento)",
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_codigo ON usuarios(codigo)",
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_numero_documento ON usuarios(numero_documento)",
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_fecha_fin ON usuarios(fecha_fin)",
+    ]),
+    Migracion(2, "Índice FTS5 para búsqueda por nombre, apellido y código", [
+        # Tabla de contenido externo: el texto vive en usuarios, FTS5 solo guarda el índice
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS usuarios_fts USING fts5(
+            nombre, apellido, codigo,
+            content='usuarios', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_fts_ai AFTER INSERT ON usuarios BEGIN
+            INSERT INTO usuarios_fts (rowid, nombre, apellido, codigo)
+            VALUES (new.id, new.nombre, new.apellido, new.codigo);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_fts_ad AFTER DELETE ON usuarios BEGIN
+            INSERT INTO usuarios_fts (usuarios_fts, rowid, nombre, apellido, codigo)
+            VALUES ('delete', old.id, old.nombre, old.apellido, old.codigo);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_fts_au AFTER UPDATE OF nombre, apellido, codigo ON usuarios BEGIN
+            INSERT INTO usuarios_fts (usuarios_fts, rowid, nombre, apellido, codigo)
+            VALUES ('delete', old.id, old.nombre, old.apellido, old.codigo);
+            INSERT INTO usuarios_fts (rowid, nombre, apellido, codigo)
+            VALUES (new.id, new.nombre, new.apellido, new.codigo);
+        END
+        """,
+        # Indexar las filas que ya existían antes de la migración
+        "INSERT INTO usuarios_fts (usuarios_fts) VALUES ('rebuild')",
+    ]),
+    Migracion(3, "Contador de cambios de usuarios (ETags)", [
+        # Una sola fila; cualquier INSERT, UPDATE o DELETE en usuarios incrementa la versión,
+        # también los hechos por otros procesos sobre el mismo archivo
+        """
+        CREATE TABLE IF NOT EXISTS usuarios_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO usuarios_version (id, version) VALUES (1, 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_version_ai AFTER INSERT ON usuarios BEGIN
+            UPDATE usuarios_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_version_au AFTER UPDATE ON usuarios BEGIN
+            UPDATE usuarios_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS usuarios_version_ad AFTER DELETE ON usuarios BEGIN
+            UPDATE usuarios_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+    ]),
+    Migracion(4, "Índices únicos por código y por documento", _indices_unicos_identificacion),
+    Migracion(5, "Índice por departamento y fecha de fin (membresías por vencer)", [
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_departamento_fecha_fin ON usuarios(departamento, fecha_fin)",
+        # El índice nuevo empieza por departamento: el de la migración 1 queda de más
+        "DROP INDEX IF EXISTS idx_usuarios_departamento",
+    ]),
+    Migracion(6, "Fechas en YYYY-MM-DD y columnas de día (fin_dia, nacimiento_mmdd)", _fechas_como_dias),
+    Migracion(7, "Contadores de membresías por departamento (membresia_stats)", _contadores_membresia),
+]
+
+
+def version_actual(conexion: sqlite3.Connection) -> int:
+    """Devolver la última versión aplicada (0 si la base de datos no tiene migraciones)"""
+    row = conexion.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def aplicar_migraciones(conexion: sqlite3.Connection) -> List[int]:
+    """
+    Aplicar las migraciones pendientes y registrarlas en schema_version.
+
+    Cada migración corre en su propia transacción (BEGIN IMMEDIATE), así que
+    dos procesos que arrancan a la vez no aplican la misma versión dos veces.
+    Devuelve las versiones aplicadas.
+    """
+    conexion.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT NOT NULL,
+        aplicada_en TEXT NOT NULL
+    )
+    """)
+    conexion.commit()
+
+    aplicadas = []
+    for migracion in sorted(MIGRACIONES, key=lambda m: m.version):
+        if migracion.version <= version_actual(conexion):
+            continue
+
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo aplicarla mientras esperábamos el bloqueo
+            if migracion.version <= version_actual(conexion):
+                conexion.rollback()
+                continue
+
+            if callable(migracion.pasos):
+                migracion.pasos(conexion)
+            else:
+                for sentencia in migracion.pasos:
+                    conexion.execute(sentencia)
+
+            conexion.execute(
+                "INSERT INTO schema_version (version, descripcion, aplicada_en) VALUES (?, ?, ?)",
+                (migracion.version, migracion.descripcion, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+
+        aplicadas.append(migracion.version)
+
+    return aplicadas
+
+
+if __name__ == "__main__":
+    # Permite actualizar una base de datos existente sin arrancar la API:
+    #   python migraciones.py ../gimnasio.db
+    import sys
+
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "../gimnasio.db"
+    conexion = sqlite3.connect(ruta)
+    try:
+        versiones = aplicar_migraciones(conexion)
+        if versiones:
+            print(f"✅ Migraciones aplicadas: {versiones}")
+        else:
+            print("✅ El esquema ya estaba actualizado")
+        print(f"📁 Versión del esquema: {version_actual(conexion)}")
+    finally:
+        conexion.close()
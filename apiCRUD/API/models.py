@@ -1,6 +1,23 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, create_model, field_validator
+from typing import Dict, List, Optional, Tuple, Type
+from functools import lru_cache
 from datetime import datetime
+from fechas import normalizar_fecha
+
+# Las fechas se guardan siempre como YYYY-MM-DD (las columnas fin_dia y nacimiento_mmdd dependen de eso)
+def validar_fecha(valor: Optional[str], obligatoria: bool = False) -> Optional[str]:
+    """
+    Convertir una fecha a YYYY-MM-DD (acepta también los formatos de fechas.FORMATOS_FECHA).
+    Un texto vacío o solo con espacios es una fecha sin cargar (None), igual que en la migración 6.
+    """
+    if valor is None or not valor.strip():
+        if obligatoria:
+            raise ValueError("La fecha es obligatoria")
+        return None
+    fecha = normalizar_fecha(valor)
+    if fecha is None:
+        raise ValueError("Fecha inválida, use YYYY-MM-DD")
+    return fecha
 
 # Modelo base con campos comunes
 class UsuarioBase(BaseModel):
@@ -37,7 +54,15 @@ class UsuarioBase(BaseModel):
 
 # Modelo para crear un nuevo usuario (sin ID, sin timestamps)
 class UsuarioCreate(UsuarioBase):
-    pass
+    @field_validator("fecha_nacimiento")
+    @classmethod
+    def normalizar_fecha_nacimiento(cls, valor: Optional[str]) -> Optional[str]:
+        return validar_fecha(valor)
+
+    @field_validator("fecha_inicio", "fecha_fin")
+    @classmethod
+    def normalizar_fechas_membresia(cls, valor: str) -> str:
+        return validar_fecha(valor, obligatoria=True)
 
 # Modelo para actualizar un usuario (todos los campos opcionales)
 class UsuarioUpdate(BaseModel):
@@ -54,6 +79,20 @@ class UsuarioUpdate(BaseModel):
     tipo_documento: Optional[str] = Field(None, max_length=50)
     numero_documento: Optional[str] = Field(None, max_length=50)
 
+    @field_validator("fecha_nacimiento")
+    @classmethod
+    def normalizar_fecha_nacimiento(cls, valor: Optional[str]) -> Optional[str]:
+        # "" borra la fecha de nacimiento (se guarda NULL); None la deja como está
+        if valor is not None and not valor.strip():
+            return ""
+        return validar_fecha(valor)
+
+    @field_validator("fecha_inicio", "fecha_fin")
+    @classmethod
+    def normalizar_fechas_membresia(cls, valor: Optional[str]) -> Optional[str]:
+        # Las fechas de membresía no se pueden borrar: vacías se dejan como están
+        return validar_fecha(valor)
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -64,6 +103,10 @@ class UsuarioUpdate(BaseModel):
             }
         }
 
+# Modelo para actualizar un usuario dentro de una operación masiva
+class UsuarioUpdateBulk(UsuarioUpdate):
+    id: int = Field(..., description="ID del usuario a actualizar")
+
 # Modelo completo con ID y timestamps (para respuestas)
 class Usuario(UsuarioBase):
     id: int
@@ -92,6 +135,41 @@ class Usuario(UsuarioBase):
             }
         }
 
+# Modelo de usuario con su estado de membresía (búsquedas por código o documento)
+class UsuarioConEstado(Usuario):
+    estado: str = Field(..., description="Estado de la membresía (VALIDO o VENCIDO)")
+
+# Modelo liviano con solo algunos campos de Usuario (respuestas con ?fields=)
+@lru_cache(maxsize=128)
+def modelo_usuario_parcial(campos: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Crear (una sola vez por combinación de campos) un modelo con los campos pedidos.
+    Conserva los tipos de Usuario pero no sus validaciones de longitud: los datos ya vienen de la base.
+    """
+    return create_model(
+        "UsuarioParcial",
+        **{campo: (Usuario.model_fields[campo].annotation, None) for campo in campos}
+    )
+
+# Modelo para una página de usuarios con paginación por cursor
+class PaginaUsuarios(BaseModel):
+    usuarios: List[Usuario] = Field(..., description="Usuarios de la página, ordenados por ID")
+    next_cursor: Optional[str] = Field(None, description="Cursor opaco de la página siguiente (null si es la última)")
+
+# Modelos para las operaciones masivas (/usuarios/bulk)
+class EliminarUsuariosBulk(BaseModel):
+    ids: List[int] = Field(..., description="IDs de los usuarios a eliminar")
+
+class ErrorBulk(BaseModel):
+    indice: int = Field(..., description="Posición del elemento en la petición (desde 0)")
+    id: Optional[int] = Field(None, description="ID del usuario, si aplica")
+    error: str = Field(..., description="Motivo del error")
+
+class ResultadoBulk(BaseModel):
+    procesados: int = Field(..., description="Número de elementos aplicados")
+    ids: List[int] = Field(default_factory=list, description="IDs de los usuarios aplicados")
+    errores: List[ErrorBulk] = Field(default_factory=list, description="Elementos rechazados")
+
 # Modelo para el estado de membresía
 class EstadoMembresia(BaseModel):
     nombre: str = Field(..., description="Nombre del usuario")
@@ -110,3 +188,33 @@ class EstadoMembresia(BaseModel):
                 "estado": "VALIDO"
             }
         }
+
+# Modelos para consultar el estado de membresía de muchos usuarios a la vez
+class ConsultaEstadosMembresia(BaseModel):
+    ids: List[int] = Field(..., description="IDs de los usuarios a consultar")
+
+class EstadosMembresia(BaseModel):
+    estados: Dict[int, str] = Field(..., description="ID del usuario -> VALIDO o VENCIDO")
+    no_encontrados: List[int] = Field(default_factory=list, description="IDs que no existen")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "estados": {"1": "VALIDO", "2": "VENCIDO"},
+                "no_encontrados": [99]
+            }
+        }
+
+# Modelos para GET /estadisticas (contadores de membresia_stats)
+class EstadisticaDepartamento(BaseModel):
+    departamento: str
+    total: int = Field(..., description="Usuarios del departamento")
+    activos: int = Field(..., description="Membresías vigentes hoy")
+    vencidos: int = Field(..., description="Membresías vencidas")
+
+class EstadisticasMembresia(BaseModel):
+    fecha: str = Field(..., description="Día al que corresponden los contadores (YYYY-MM-DD)")
+    total: int
+    activos: int
+    vencidos: int
+    departamentos: List[EstadisticaDepartamento] = Field(default_factory=list)
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import os
+from typing import Optional
+
+# Configuración de SQLite (se puede sobreescribir con variables de entorno)
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-16000"))  # Negativo = KiB (16 MB)
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))  # 128 MB
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"))  # Milisegundos
+
+VALORES_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite con una conexión persistente por hilo.
+
+    Cada hilo abre su conexión una sola vez (en modo WAL y con los pragmas
+    configurados) y la reutiliza en todas las peticiones siguientes.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        synchronous: str = SQLITE_SYNCHRONOUS,
+        cache_size: int = SQLITE_CACHE_SIZE,
+        mmap_size: int = SQLITE_MMAP_SIZE,
+        busy_timeout: int = SQLITE_BUSY_TIMEOUT
+    ):
+        synchronous = synchronous.upper()
+        if synchronous not in VALORES_SYNCHRONOUS:
+            raise ValueError(f"Valor de synchronous inválido: {synchronous}")
+
+        self.db_path = db_path
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexiones = []
+        self._aperturas = 0
+        # Cada hilo cuenta sus reutilizaciones en su propia lista de un elemento (sin tomar
+        # el lock en cada petición); estadisticas() las suma
+        self._contadores = []
+        self._reutilizaciones_cerradas = 0
+
+    def _abrir(self) -> sqlite3.Connection:
+        """Abrir una conexión nueva y aplicar los pragmas"""
+        # check_same_thread=False solo para poder cerrarla desde otro hilo al apagar;
+        # durante su vida cada conexión la usa únicamente el hilo que la abrió
+        conexion = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False
+        )
+        conexion.row_factory = sqlite3.Row  # Para poder acceder a las columnas por nombre
+        conexion.execute("PRAGMA journal_mode = WAL")
+        conexion.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conexion.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conexion.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conexion.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conexion.execute("PRAGMA foreign_keys = ON")
+        return conexion
+
+    def obtener(self) -> sqlite3.Connection:
+        """Devolver la conexión del hilo actual, abriéndola si aún no existe"""
+        conexion: Optional[sqlite3.Connection] = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            self._local.reutilizaciones[0] += 1
+            return conexion
+
+        conexion = self._abrir()
+        contador = [0]
+        self._local.conexion = conexion
+        self._local.reutilizaciones = contador
+        with self._lock:
+            self._conexiones.append(conexion)
+            self._contadores.append(contador)
+            self._aperturas += 1
+        return conexion
+
+    def abrir_dedicada(self) -> sqlite3.Connection:
+        """
+        Abrir una conexión fuera del pool (con los mismos pragmas) para operaciones largas
+        como exportaciones; quien la abre es responsable de cerrarla.
+        """
+        return self._abrir()
+
+    def cerrar_todas(self):
+        """Cerrar todas las conexiones abiertas por el pool"""
+        with self._lock:
+            conexiones = self._conexiones
+            self._conexiones = []
+            self._reutilizaciones_cerradas += sum(contador[0] for contador in self._contadores)
+            self._contadores = []
+        for conexion in conexiones:
+            try:
+                conexion.close()
+            except sqlite3.Error:
+                pass
+        # Las conexiones cerradas no deben volver a usarse en ningún hilo
+        self._local = threading.local()
+
+    def estadisticas(self) -> dict:
+        """Estadísticas de uso del pool"""
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "conexiones_abiertas": len(self._conexiones),
+                "aperturas": self._aperturas,
+                "reutilizaciones": self._reutilizaciones_cerradas + sum(contador[0] for contador in self._contadores),
+                "pragmas": {
+                    "journal_mode": "WAL",
+                    "synchronous": self.synchronous,
+                    "cache_size": self.cache_size,
+                    "mmap_size": self.mmap_size,
+                    "busy_timeout": self.busy_timeout
+                }
+            }
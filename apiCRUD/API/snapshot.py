@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Servir las lecturas de usuarios desde memoria (se activa con USUARIOS_EN_MEMORIA=1)
+USUARIOS_EN_MEMORIA = os.environ.get("USUARIOS_EN_MEMORIA", "0").lower() in ("1", "true", "si", "sí")
+
+
+class SnapshotUsuarios:
+    """
+    Copia en memoria de la tabla usuarios.
+
+    Cada fila se guarda como una tupla (en el orden de `columnas`) y los IDs
+    ordenados viven en arreglos compactos de enteros, uno global y uno por
+    departamento, así que listar y filtrar no tocan SQLite. Las escrituras de
+    database.py aplican sus cambios aquí y cada cambio incrementa `version`.
+    """
+
+    __slots__ = ("columnas", "activo", "version", "cargado_en", "_filas", "_ids", "_por_departamento", "_lock", "_indice_departamento")
+
+    def __init__(self, columnas: Sequence[str], activo: bool = USUARIOS_EN_MEMORIA):
+        self.columnas = tuple(columnas)
+        self.activo = activo
+        self.version = 0
+        self.cargado_en: Optional[str] = None
+        self._filas: Dict[int, tuple] = {}
+        self._ids = array("q")
+        self._por_departamento: Dict[str, array] = {}
+        self._lock = threading.RLock()
+        self._indice_departamento = self.columnas.index("departamento")
+
+    def _tupla(self, row) -> tuple:
+        return tuple(row[columna] for columna in self.columnas)
+
+    def cargar(self, rows: Iterable):
+        """Reemplazar todo el contenido con las filas dadas (sqlite3.Row o diccionarios)"""
+        filas = {}
+        por_departamento: Dict[str, List[int]] = {}
+        for row in rows:
+            fila = self._tupla(row)
+            filas[fila[0]] = fila
+            por_departamento.setdefault(fila[self._indice_departamento], []).append(fila[0])
+
+        with self._lock:
+            self._filas = filas
+            self._ids = array("q", sorted(filas))
+            self._por_departamento = {
+                departamento: array("q", sorted(ids)) for departamento, ids in por_departamento.items()
+            }
+            self.version += 1
+            self.cargado_en = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def aplicar(self, rows: Iterable):
+        """Insertar o reemplazar filas creadas o actualizadas"""
+        with self._lock:
+            for row in rows:
+                fila = self._tupla(row)
+                usuario_id = fila[0]
+                anterior = self._filas.get(usuario_id)
+                departamento = fila[self._indice_departamento]
+                if anterior is None:
+                    _insertar_ordenado(self._ids, usuario_id)
+                if anterior is None or anterior[self._indice_departamento] != departamento:
+                    if anterior is not None:
+                        self._quitar_de_departamento(anterior)
+                    _insertar_ordenado(self._por_departamento.setdefault(departamento, array("q")), usuario_id)
+                self._filas[usuario_id] = fila
+            self.version += 1
+
+    def eliminar(self, ids: Iterable[int]):
+        """Quitar usuarios eliminados"""
+        with self._lock:
+            for usuario_id in ids:
+                anterior = self._filas.pop(usuario_id, None)
+                if anterior is None:
+                    continue
+                _quitar_ordenado(self._ids, usuario_id)
+                self._quitar_de_departamento(anterior)
+            self.version += 1
+
+    def _quitar_de_departamento(self, fila: tuple):
+        departamento = fila[self._indice_departamento]
+        ids = self._por_departamento.get(departamento)
+        if ids is not None:
+            _quitar_ordenado(ids, fila[0])
+            if not ids:
+                del self._por_departamento[departamento]
+
+    def obtener(self, usuario_id: int) -> Optional[dict]:
+        fila = self._filas.get(usuario_id)
+        return dict(zip(self.columnas, fila)) if fila is not None else None
+
+    def listar(
+        self,
+        skip: int = 0,
+        limit: int = 10000,
+        departamento: Optional[str] = None,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """Usuarios ordenados por ID, igual que ORDER BY id LIMIT ? OFFSET ? (solo `campos` si se indican)"""
+        with self._lock:
+            ids = self._ids_de(departamento)
+            if campos is None or tuple(campos) == self.columnas:
+                return [dict(zip(self.columnas, self._filas[usuario_id])) for usuario_id in ids[skip:skip + limit]]
+            posiciones = [self.columnas.index(campo) for campo in campos]
+            return [
+                {campo: fila[posicion] for campo, posicion in zip(campos, posiciones)}
+                for fila in (self._filas[usuario_id] for usuario_id in ids[skip:skip + limit])
+            ]
+
+    def pagina(self, ultimo_id: int, limit: int, departamento: Optional[str] = None) -> List[dict]:
+        """Hasta `limit` usuarios con ID mayor que `ultimo_id`, igual que la consulta por cursor"""
+        with self._lock:
+            ids = self._ids_de(departamento)
+            inicio = bisect_right(ids, ultimo_id)
+            return [dict(zip(self.columnas, self._filas[usuario_id])) for usuario_id in ids[inicio:inicio + limit]]
+
+    def _ids_de(self, departamento: Optional[str]) -> array:
+        if departamento:
+            return self._por_departamento.get(departamento, array("q"))
+        return self._ids
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            # Tamaño aproximado: tuplas, valores de texto, diccionario de filas y arreglos de IDs
+            bytes_filas = sum(
+                sys.getsizeof(fila) + sum(sys.getsizeof(valor) for valor in fila if isinstance(valor, str))
+                for fila in self._filas.values()
+            )
+            bytes_ids = sys.getsizeof(self._ids) + sum(sys.getsizeof(ids) for ids in self._por_departamento.values())
+            return {
+                "activo": self.activo,
+                "usuarios": len(self._filas),
+                "departamentos": len(self._por_departamento),
+                "version": self.version,
+                "cargado_en": self.cargado_en,
+                "bytes_aproximados": bytes_filas + bytes_ids + sys.getsizeof(self._filas)
+            }
+
+
+def _insertar_ordenado(ids: array, usuario_id: int):
+    """Insertar un ID en un arreglo ordenado (los IDs nuevos casi siempre van al final)"""
+    if not ids or ids[-1] < usuario_id:
+        ids.append(usuario_id)
+        return
+    posicion = bisect_left(ids, usuario_id)
+    if posicion == len(ids) or ids[posicion] != usuario_id:
+        ids.insert(posicion, usuario_id)
+
+
+def _quitar_ordenado(ids: array, usuario_id: int):
+    posicion = bisect_left(ids, usuario_id)
+    if posicion < len(ids) and ids[posicion] == usuario_id:
+        del ids[posicion]
@@ -0,0 +1,44 @@
+"""
+Configuración de las pruebas de la capa de datos y de la API.
+
+Las pruebas usan una base de datos temporal (nunca gimnasio.db) y cada una empieza
+con la base vacía. Se ejecutan desde apiCRUD/API con:
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# La base de datos temporal debe configurarse antes de importar database
+_DIRECTORIO_TMP = tempfile.mkdtemp(prefix="gimnasio_tests_")
+os.environ["GIMNASIO_DB_PATH"] = os.path.join(_DIRECTORIO_TMP, "tests.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def _borrar_base_de_datos():
+    database.cerrar_conexiones()
+    for sufijo in ("", "-wal", "-shm"):
+        try:
+            os.remove(database.DB_PATH + sufijo)
+        except FileNotFoundError:
+            pass
+    database.cache_estado_membresia.limpiar()
+
+
+@pytest.fixture
+def bd():
+    """Base de datos vacía con el esquema y las migraciones aplicadas"""
+    _borrar_base_de_datos()
+    database.inicializar_bd()
+    yield database
+    _borrar_base_de_datos()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    database.cerrar_conexiones()
+    shutil.rmtree(_DIRECTORIO_TMP, ignore_errors=True)
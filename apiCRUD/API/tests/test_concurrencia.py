@@ -0,0 +1,52 @@
+"""Las lecturas siguen respondiendo mientras una escritura espera el bloqueo de SQLite"""
+import asyncio
+import random
+import sqlite3
+import time
+
+import httpx
+
+import main as api
+from datos_sinteticos import generar_usuario, poblar
+
+BLOQUEO = 1.0  # Segundos que otra conexión retiene el bloqueo de escritura
+LECTURAS = 50
+
+
+def test_lecturas_avanzan_con_una_escritura_bloqueada(bd):
+    poblar(1000)
+
+    async def prueba():
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://tests") as cliente:
+            bloqueador = sqlite3.connect(bd.DB_PATH, check_same_thread=False)
+            bloqueador.execute("BEGIN IMMEDIATE")
+            inicio = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            liberar = loop.run_in_executor(None, lambda: (time.sleep(BLOQUEO), bloqueador.rollback()))
+
+            async def escritura():
+                respuesta = await cliente.post("/usuarios", json=generar_usuario(0).model_dump())
+                return respuesta.status_code, time.perf_counter() - inicio
+
+            async def lectura(i: int):
+                url = "/" if i % 5 == 0 else f"/usuarios/{random.randint(1, 1000)}"
+                t0 = time.perf_counter()
+                respuesta = await cliente.get(url)
+                return respuesta.status_code, time.perf_counter() - t0, time.perf_counter() - inicio
+
+            tarea_escritura = asyncio.create_task(escritura())
+            await asyncio.sleep(0.05)  # Asegurar que el POST ya está esperando el bloqueo
+            lecturas = await asyncio.gather(*(lectura(i) for i in range(LECTURAS)))
+            estado_escritura, fin_escritura = await tarea_escritura
+            await liberar
+            bloqueador.close()
+            return lecturas, estado_escritura, fin_escritura
+
+    lecturas, estado_escritura, fin_escritura = asyncio.run(prueba())
+
+    assert estado_escritura == 201
+    assert all(estado == 200 for estado, _, _ in lecturas)
+    # Todas las lecturas terminaron antes que la escritura y ninguna esperó el bloqueo
+    assert max(fin for _, _, fin in lecturas) < fin_escritura
+    assert max(latencia for _, latencia, _ in lecturas) < BLOQUEO / 2
@@ -0,0 +1,33 @@
+"""Los contadores de membresia_stats coinciden con un conteo completo de la tabla"""
+import random
+
+import estadisticas
+from datos_sinteticos import DEPARTAMENTOS, generar_usuario, poblar
+from fechas import dia_actual
+from models import UsuarioUpdate
+
+USUARIOS = 5000
+ESCRITURAS = 500
+
+
+def test_contadores_despues_de_escrituras_mezcladas(bd):
+    poblar(USUARIOS)
+    ids = [bd.crear_usuario(generar_usuario(USUARIOS + i)).id for i in range(1, ESCRITURAS + 1)]
+    for usuario_id in random.sample(ids, len(ids) // 2):
+        bd.actualizar_usuario(usuario_id, UsuarioUpdate(
+            departamento=random.choice(DEPARTAMENTOS), fecha_fin=generar_usuario(usuario_id).fecha_fin
+        ))
+    for usuario_id in random.sample(ids, len(ids) // 4):
+        bd.eliminar_usuario(usuario_id)
+
+    assert estadisticas.diferencias(bd.obtener_conexion()) == []
+
+
+def test_contadores_despues_de_un_cambio_de_dia(bd):
+    poblar(USUARIOS)
+    # Retroceder el día guardado 30 días y avanzar de nuevo: vencen las membresías de esos días
+    with bd.conexion_bd() as conexion:
+        estadisticas.reconstruir(conexion, dia_actual() - 30)
+    bd.avanzar_dia_estadisticas()
+
+    assert estadisticas.diferencias(bd.obtener_conexion()) == []
@@ -0,0 +1,38 @@
+"""Estado de membresía y cumpleaños calculados en SQLite (fin_dia, nacimiento_mmdd) frente a Python"""
+from datetime import date, datetime, timedelta
+
+from datos_sinteticos import poblar
+
+USUARIOS = 5000
+
+
+def test_estados_de_membresia_coinciden_con_python(bd):
+    poblar(USUARIOS)
+    hoy = date.today()
+    esperados = {
+        usuario.id: "VALIDO" if hoy < datetime.strptime(usuario.fecha_fin, "%Y-%m-%d").date() else "VENCIDO"
+        for usuario in bd.obtener_todos_usuarios(0, USUARIOS)
+    }
+
+    assert bd.obtener_estados_membresia(list(range(1, USUARIOS + 1))) == esperados
+
+
+def test_cumpleanos_coinciden_con_python_y_usan_el_indice(bd):
+    poblar(USUARIOS)
+    dias = 7
+    hoy = date.today()
+    ventana = {(dia.month, dia.day) for dia in (hoy + timedelta(days=n) for n in range(dias + 1))}
+    esperados = set()
+    for usuario in bd.obtener_todos_usuarios(0, USUARIOS):
+        nacimiento = datetime.strptime(usuario.fecha_nacimiento, "%Y-%m-%d").date()
+        if (nacimiento.month, nacimiento.day) in ventana:
+            esperados.add(usuario.id)
+
+    assert {usuario.id for usuario in bd.obtener_cumpleanos(dias, USUARIOS)} == esperados
+
+    plan = " | ".join(
+        fila[3] for fila in bd.obtener_conexion().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM usuarios WHERE nacimiento_mmdd BETWEEN ? AND ?", (101, 107)
+        )
+    )
+    assert "idx_usuarios_nacimiento_mmdd" in plan
@@ -0,0 +1,60 @@
+"""GET /membresia/por-vencer: todas las páginas coinciden con un filtrado en Python y la consulta usa el índice"""
+import asyncio
+from datetime import date, datetime, timedelta
+
+import httpx
+
+import main as api
+from datos_sinteticos import poblar
+
+USUARIOS = 20000
+DIAS = 30
+TAMANO = 50  # Varias páginas: también se prueba la continuación por cursor
+
+
+async def _recorrer(departamento=None):
+    """Todas las filas de /membresia/por-vencer siguiendo next_cursor"""
+    transporte = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://tests", timeout=None) as cliente:
+        cursor, filas = None, []
+        while True:
+            parametros = {"dias": DIAS, "limit": TAMANO}
+            if cursor:
+                parametros["cursor"] = cursor
+            if departamento:
+                parametros["departamento"] = departamento
+            respuesta = await cliente.get("/membresia/por-vencer", params=parametros)
+            assert respuesta.status_code == 200
+            datos = respuesta.json()
+            filas.extend((usuario["fecha_fin"], usuario["id"]) for usuario in datos["usuarios"])
+            cursor = datos["next_cursor"]
+            if not cursor:
+                return filas
+
+
+def _esperados(bd, departamento=None):
+    hoy = date.today()
+    esperados = []
+    for usuario in bd.obtener_todos_usuarios(0, USUARIOS, departamento):
+        fecha_fin = datetime.strptime(usuario.fecha_fin, "%Y-%m-%d").date()
+        if hoy < fecha_fin <= hoy + timedelta(days=DIAS):
+            esperados.append((usuario.fecha_fin, usuario.id))
+    return sorted(esperados)
+
+
+def test_por_vencer_coincide_con_el_filtrado_completo(bd):
+    poblar(USUARIOS)
+
+    assert asyncio.run(_recorrer()) == _esperados(bd)
+    assert asyncio.run(_recorrer("Yoga")) == _esperados(bd, "Yoga")
+
+
+def test_por_vencer_usa_el_indice(bd):
+    plan = " | ".join(
+        fila[3] for fila in bd.obtener_conexion().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM usuarios WHERE fin_dia > ? AND fin_dia <= ? ORDER BY fin_dia, id",
+            (20000, 20030)
+        )
+    )
+    assert "idx_usuarios_fin_dia" in plan
+    assert "TEMP B-TREE" not in plan
@@ -1,7 +1,13 @@
 import sqlite3
 import json
+import os
+import sys
 from datetime import datetime, timedelta
 
+# extraer_fecha vive en API/fechas.py para compartirla con la importación de la API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "API"))
+from fechas import extraer_fecha, normalizar_fecha
+
 # Crear la base de datos SQLite
 conexion = sqlite3.connect("gimnasio.db")
 cursor = conexion.cursor()
@@ -33,38 +39,14 @@ print("Tabla 'usuarios' creada exitosamente.")
 with open('gimnasio_db.usuarios.json', 'r', encoding='utf-8') as file:
     usuarios_data = json.load(file)
 
-# Función para extraer fecha del formato MongoDB
-def extraer_fecha(fecha_obj):
-    if not fecha_obj:
-        return None
-    if isinstance(fecha_obj, dict):
-        if '$date' in fecha_obj:
-            fecha_str = fecha_obj['$date']
-            if isinstance(fecha_str, str):
-                # Formato ISO: "2025-11-25T00:00:00.000Z"
-                try:
-                    dt = datetime.fromisoformat(fecha_str.replace('Z', '+00:00'))
-                    return dt.strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    return None
-            elif isinstance(fecha_str, dict) and '$numberLong' in fecha_str:
-                # Formato timestamp: {"$numberLong": "-239500800000"}
-                try:
-                    timestamp = int(fecha_str['$numberLong']) / 1000
-                    dt = datetime.fromtimestamp(timestamp)
-                    return dt.strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    return None
-    return None
-
 # Migrar los datos
 contador_exitosos = 0
 contador_fallidos = 0
 contador_autocompletados = 0
 
-# Fechas por defecto
-fecha_hoy = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-fecha_manana = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+# Fechas por defecto (solo la fecha: la API compara fechas YYYY-MM-DD)
+fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+fecha_manana = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
 
 for usuario in usuarios_data:
     try:
@@ -76,9 +58,9 @@ for usuario in usuarios_data:
         # Para departamento, usar departamento_nombre si existe, sino "Sin departamento"
         departamento = usuario.get('departamento_nombre') or usuario.get('departamento') or "Sin departamento"
         
-        fecha_nacimiento = extraer_fecha(usuario.get('fecha_nacimiento'))
-        fecha_inicio = extraer_fecha(usuario.get('fecha_inicio'))
-        fecha_fin = extraer_fecha(usuario.get('fecha_fin'))
+        fecha_nacimiento = normalizar_fecha(usuario.get('fecha_nacimiento'))
+        fecha_inicio = normalizar_fecha(usuario.get('fecha_inicio'))
+        fecha_fin = normalizar_fecha(usuario.get('fecha_fin'))
         
         # Autocompletar fechas si faltan
         if not fecha_inicio:
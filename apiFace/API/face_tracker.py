@@ -0,0 +1,241 @@
+"""
+Seguimiento de caras entre reconocimientos.
+
+Cada resultado de CompreFace se asocia con las caras que ya se seguían por IoU
+(superposición de recuadros), así cada persona conserva un track_id estable.
+Entre reconocimientos los recuadros se interpolan con la velocidad medida o,
+si está activado, se refinan con un tracker de OpenCV en CPU. Solo se pide un
+reconocimiento nuevo cuando hay caras sin confirmar o que no aparecieron en el
+último reconocimiento; con todas confirmadas se vuelve a consultar cada
+REVALIDATION_INTERVAL segundos (para ver si llegó alguien más, si alguien se
+fue o si la persona cambió). Si en esa consulta la cara sale desconocida o como
+otra persona, la identidad se descarta y se vuelve a confirmar.
+"""
+import itertools
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+# IoU mínima para considerar que un recuadro nuevo es la misma cara
+IOU_THRESHOLD = 0.3
+
+# Similitud mínima para dar por reconocida una cara
+SIMILARITY_THRESHOLD = 0.85
+
+# Reconocimientos seguidos sin confirmar tras los que una cara se da por desconocida
+MAX_RECOGNITION_ATTEMPTS = 5
+
+# Reconocimientos seguidos en los que una cara no aparece antes de olvidarla
+MAX_MISSES = 2
+
+# Segundos entre reconocimientos cuando todas las caras están confirmadas
+REVALIDATION_INTERVAL = 3.0
+
+# Segundos máximos que se extrapola un recuadro con su velocidad
+MAX_EXTRAPOLATION = 0.5
+
+# Refinar los recuadros con trackers de OpenCV entre reconocimientos (más CPU)
+USE_OPENCV_TRACKERS = False
+
+Box = Tuple[float, float, float, float]  # x_min, y_min, x_max, y_max
+
+
+def iou(a: Box, b: Box) -> float:
+    """Intersección sobre unión de dos recuadros"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def best_subject(face: dict) -> Optional[dict]:
+    """Mejor coincidencia de un resultado de CompreFace (None si no hay)"""
+    subjects = face.get('subjects') or []
+    return max(subjects, key=lambda k: k.get('similarity', 0)) if subjects else None
+
+
+def create_opencv_tracker():
+    """Tracker de OpenCV disponible en esta instalación (KCF o MIL), o None"""
+    for module in (cv2, getattr(cv2, 'legacy', None)):
+        for name in ('TrackerKCF_create', 'TrackerMIL_create'):
+            factory = getattr(module, name, None) if module is not None else None
+            if factory is not None:
+                return factory()
+    return None
+
+
+class Track:
+    """Una cara seguida entre frames"""
+
+    def __init__(self, track_id: int, box: Box, timestamp: float):
+        self.track_id = track_id
+        self.box = box
+        self.timestamp = timestamp  # Hora del frame en que se midió `box`
+        self.velocity = (0.0, 0.0, 0.0, 0.0)  # Píxeles por segundo de cada coordenada
+        self.subjects: List[dict] = []
+        self.confirmed = False
+        self.attempts = 0  # Reconocimientos sin confirmar
+        self.misses = 0
+        self.cv_tracker = None
+
+    def observe(self, box: Box, timestamp: float):
+        """Actualizar con un recuadro medido (por CompreFace o por el tracker de OpenCV)"""
+        elapsed = timestamp - self.timestamp
+        if elapsed > 0:
+            self.velocity = tuple((new - old) / elapsed for new, old in zip(box, self.box))
+        self.box = box
+        self.timestamp = timestamp
+
+    def predict(self, timestamp: float) -> Box:
+        """Recuadro interpolado para la hora dada"""
+        elapsed = min(max(timestamp - self.timestamp, 0.0), MAX_EXTRAPOLATION)
+        return tuple(value + speed * elapsed for value, speed in zip(self.box, self.velocity))
+
+    @property
+    def settled(self) -> bool:
+        """
+        Confirmada (o dada por desconocida después de varios intentos) y presente en el
+        último reconocimiento. Una cara que faltó se vuelve a consultar enseguida, así
+        una persona que se fue se olvida en MAX_MISSES reconocimientos seguidos.
+        """
+        return (self.confirmed or self.attempts >= MAX_RECOGNITION_ATTEMPTS) and self.misses == 0
+
+
+class FaceTracker:
+    def __init__(self, use_opencv_trackers: bool = USE_OPENCV_TRACKERS):
+        self.use_opencv_trackers = use_opencv_trackers
+        self._tracks: Dict[int, Track] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._last_recognition = 0.0
+
+        self.tracks_created = 0
+
+    def needs_recognition(self, timestamp: float) -> bool:
+        """
+        Indicar si conviene enviar un frame a CompreFace: siempre que no haya caras
+        seguidas o alguna esté sin confirmar o haya faltado en el último reconocimiento;
+        si todas están confirmadas y presentes, solo cada REVALIDATION_INTERVAL segundos.
+        """
+        with self._lock:
+            if not self._tracks or any(not track.settled for track in self._tracks.values()):
+                return True
+            return timestamp - self._last_recognition >= REVALIDATION_INTERVAL
+
+    def has_missing_tracks(self) -> bool:
+        """Alguna cara seguida faltó en el último reconocimiento (hay que confirmar si se fue)"""
+        with self._lock:
+            return any(track.misses for track in self._tracks.values())
+
+    def update(self, faces: List[dict], timestamp: float, frame=None):
+        """Asociar los resultados de un reconocimiento con las caras seguidas"""
+        with self._lock:
+            self._last_recognition = timestamp
+            detections = [(self._box_of(face), face) for face in faces if face.get('box')]
+
+            # Asociación voraz: primero los pares con más superposición
+            pairs = sorted(
+                ((iou(track.predict(timestamp), box), track_id, index)
+                 for track_id, track in self._tracks.items()
+                 for index, (box, _) in enumerate(detections)),
+                reverse=True
+            )
+            matched_tracks, matched_detections = set(), set()
+            for overlap, track_id, index in pairs:
+                if overlap < IOU_THRESHOLD:
+                    break
+                if track_id in matched_tracks or index in matched_detections:
+                    continue
+                matched_tracks.add(track_id)
+                matched_detections.add(index)
+                self._apply(self._tracks[track_id], *detections[index], timestamp, frame)
+
+            # Cualquier reconocimiento en el que una cara seguida no aparece cuenta como falta
+            for track_id in list(self._tracks):
+                if track_id not in matched_tracks:
+                    track = self._tracks[track_id]
+                    track.misses += 1
+                    if track.misses >= MAX_MISSES:
+                        del self._tracks[track_id]
+
+            for index, (box, face) in enumerate(detections):
+                if index not in matched_detections:
+                    track = Track(next(self._ids), box, timestamp)
+                    self._tracks[track.track_id] = track
+                    self.tracks_created += 1
+                    self._apply(track, box, face, timestamp, frame)
+
+    def refine(self, frame, timestamp: float):
+        """Mover los recuadros con los trackers de OpenCV (solo si están activados)"""
+        if not self.use_opencv_trackers:
+            return
+        with self._lock:
+            tracks = [track for track in self._tracks.values() if track.cv_tracker is not None]
+        # Los trackers de OpenCV tardan decenas de ms: se actualizan sin el lock para no
+        # frenar al stream (solo este hilo los usa)
+        for track in tracks:
+            ok, (x, y, width, height) = track.cv_tracker.update(frame)
+            with self._lock:
+                if ok:
+                    track.observe((x, y, x + width, y + height), timestamp)
+                else:
+                    track.cv_tracker = None  # Se vuelve a iniciar en el próximo reconocimiento
+
+    def faces(self, timestamp: float) -> List[dict]:
+        """Caras seguidas en el formato de CompreFace, con el recuadro interpolado y el track_id"""
+        with self._lock:
+            faces = []
+            for track in self._tracks.values():
+                x_min, y_min, x_max, y_max = (int(round(value)) for value in track.predict(timestamp))
+                faces.append({
+                    "box": {"x_min": x_min, "y_min": y_min, "x_max": x_max, "y_max": y_max},
+                    "subjects": track.subjects,
+                    "track_id": track.track_id,
+                    "confirmed": track.confirmed
+                })
+            return faces
+
+    def clear(self):
+        with self._lock:
+            self._tracks.clear()
+            self._last_recognition = 0.0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "active_tracks": len(self._tracks),
+                "confirmed_tracks": sum(1 for track in self._tracks.values() if track.confirmed),
+                "tracks_created": self.tracks_created,
+                "opencv_trackers": self.use_opencv_trackers
+            }
+
+    def _apply(self, track: Track, box: Box, face: dict, timestamp: float, frame):
+        track.observe(box, timestamp)
+        track.misses = 0
+        match = best_subject(face)
+        track.subjects = face.get('subjects', [])
+        if match is not None and match.get('similarity', 0) >= SIMILARITY_THRESHOLD:
+            # Confirmada (si antes era otra persona, queda la nueva identidad)
+            track.confirmed = True
+            track.attempts = 0
+        else:
+            # Desconocida o dudosa: si estaba confirmada puede ser otra persona en el mismo
+            # lugar, así que se descarta la identidad y se vuelve a intentar confirmar
+            if track.confirmed:
+                track.confirmed = False
+                track.attempts = 0
+            track.attempts += 1
+        if self.use_opencv_trackers and frame is not None:
+            track.cv_tracker = create_opencv_tracker()
+            if track.cv_tracker is not None:
+                x_min, y_min, x_max, y_max = (int(value) for value in box)
+                track.cv_tracker.init(frame, (x_min, y_min, x_max - x_min, y_max - y_min))
+
+    @staticmethod
+    def _box_of(face: dict) -> Box:
+        box = face['box']
+        return (float(box['x_min']), float(box['y_min']), float(box['x_max']), float(box['y_max']))
@@ -0,0 +1,82 @@
+"""
+Buffer circular de frames de la webcam.
+
+El hilo de captura escribe cada frame en uno de N arreglos preasignados (no se
+reserva memoria por frame) y le asigna un número de secuencia creciente. Los
+consumidores piden "el último frame más nuevo que la secuencia X": si no hay
+uno nuevo esperan, y si se atrasaron saltan directo al último. Así varios
+lectores nunca provocan varias lecturas de la cámara.
+"""
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Frames en el buffer: el último publicado más los que se pueden estar escribiendo
+FRAME_RING_SIZE = 3
+
+
+class FrameRing:
+    def __init__(self, size: int = FRAME_RING_SIZE):
+        if size < 2:
+            raise ValueError("El buffer necesita al menos 2 frames")
+        self.size = size
+        self._slots: List[Optional[np.ndarray]] = [None] * size
+        self._timestamps = [0.0] * size
+        self._seq = 0  # Secuencia del último frame publicado (0 = ninguno todavía)
+        self._condition = threading.Condition()
+
+    @property
+    def seq(self) -> int:
+        with self._condition:
+            return self._seq
+
+    def next_slot(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Arreglo donde el hilo de captura debe escribir el próximo frame.
+        Solo se crea la primera vez (o si cambia la resolución); después se reutiliza.
+        Nunca es el slot del último frame publicado, que pueden estar copiando los lectores.
+        """
+        index = (self._seq + 1) % self.size
+        slot = self._slots[index]
+        if slot is None or slot.shape != shape or slot.dtype != dtype:
+            slot = np.empty(shape, dtype=dtype)
+            self._slots[index] = slot
+        return slot
+
+    def publish(self, timestamp: Optional[float] = None) -> int:
+        """Publicar el frame escrito en next_slot() y despertar a los lectores; devuelve su secuencia"""
+        with self._condition:
+            self._seq += 1
+            self._timestamps[self._seq % self.size] = timestamp if timestamp is not None else time.time()
+            self._condition.notify_all()
+            return self._seq
+
+    def latest(self, after_seq: int = 0) -> Tuple[int, Optional[np.ndarray], float]:
+        """
+        Copia del último frame si su secuencia es mayor que `after_seq`.
+        Devuelve (secuencia, frame, timestamp); frame es None si no hay uno más nuevo.
+        """
+        with self._condition:
+            return self._copy_latest(after_seq)
+
+    def wait_newer(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[np.ndarray], float]:
+        """Como latest(), pero espera hasta `timeout` segundos a que llegue un frame nuevo"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > after_seq, timeout)
+            return self._copy_latest(after_seq)
+
+    def clear(self):
+        """Olvidar los frames (al detener la webcam); los arreglos se reservan de nuevo al reiniciar"""
+        with self._condition:
+            self._slots = [None] * self.size
+            self._condition.notify_all()
+
+    def _copy_latest(self, after_seq: int) -> Tuple[int, Optional[np.ndarray], float]:
+        # Se copia con el lock tomado: el hilo de captura no puede publicar encima mientras tanto
+        index = self._seq % self.size
+        frame = self._slots[index]
+        if self._seq <= after_seq or frame is None:
+            return self._seq, None, 0.0
+        return self._seq, frame.copy(), self._timestamps[index]
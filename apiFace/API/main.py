@@ -2,6 +2,12 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
+from compresion import CompresionMiddleware
+from frame_buffer import FrameRing
+from face_tracker import FaceTracker
+from motion_gate import MotionGate, MOTION_THRESHOLD
+from recognition_worker import RecognitionWorker
+from mjpeg_broadcaster import MjpegBroadcaster
 from compreface import CompreFace
 from compreface.service import RecognitionService
 from compreface.collections import FaceCollection
@@ -13,7 +19,7 @@ import uuid
 import cv2
 import asyncio
 import json
-from threading import Lock
+from threading import Event, Thread
 import time
 
 # Configurar logging
@@ -45,11 +51,32 @@ class WebcamManager:
     def __init__(self):
         self.capture: Optional[cv2.VideoCapture] = None
         self.is_running = False
-        self.current_frame = None
-        self.recognition_results = []
-        self.lock = Lock()
-        self.last_recognition_time = 0
         self.recognition_interval = 0.3  # Reconocer cada 0.3 segundos
+        self.motion_threshold = MOTION_THRESHOLD  # Fracción de píxeles cambiados para volver a reconocer
+        
+        # Captura en un hilo propio: escribe en el buffer circular al ritmo nativo de la cámara
+        self.frames = FrameRing()
+        self.capture_thread: Optional[Thread] = None
+        self.stop_event = Event()
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.capture_fps = 0.0
+        
+        # Seguimiento de caras: mantiene los recuadros entre reconocimientos y evita
+        # consultar a CompreFace por caras que ya están confirmadas
+        self.tracker = FaceTracker()
+        
+        # Compuerta de movimiento: sin cambios en la escena no se envía nada a CompreFace
+        self.motion_gate = MotionGate(self.motion_threshold)
+        
+        # Reconocimiento en otro hilo: una petición a CompreFace a la vez, siempre con el frame más nuevo
+        self.recognition_worker = RecognitionWorker(
+            self.frames, recognition.recognize, self.recognition_interval,
+            tracker=self.tracker, motion_gate=self.motion_gate
+        )
+        
+        # Stream MJPEG: cada frame se anota y codifica una sola vez para todos los clientes
+        self.broadcaster = MjpegBroadcaster(self.frames, self.annotate_frame)
         
     def start(self):
         """Inicia la captura de la webcam"""
@@ -74,6 +101,15 @@ class WebcamManager:
             # Leer primer frame para "calentar" la cámara
             self.capture.read()
             
+            self.stop_event.clear()
+            self.frames_captured = 0
+            self.read_failures = 0
+            self.capture_thread = Thread(target=self._capture_loop, name="webcam-capture", daemon=True)
+            self.capture_thread.start()
+            self.recognition_worker.interval = self.recognition_interval
+            self.motion_gate.threshold = self.motion_threshold
+            self.recognition_worker.start()
+            
             self.is_running = True
             logger.info("Webcam iniciada correctamente")
             return {"status": "success", "message": "Webcam iniciada"}
@@ -83,50 +119,53 @@ class WebcamManager:
     
     def stop(self):
         """Detiene la captura de la webcam"""
+        self.is_running = False
+        self.recognition_worker.stop()
+        self.stop_event.set()
+        if self.capture_thread:
+            self.capture_thread.join(timeout=2)
+            self.capture_thread = None
         if self.capture:
             self.capture.release()
             self.capture = None
-        self.is_running = False
-        self.current_frame = None
-        self.recognition_results = []
+        self.frames.clear()
+        self.capture_fps = 0.0
         logger.info("Webcam detenida")
         return {"status": "success", "message": "Webcam detenida"}
     
-    async def get_frame_with_recognition(self):
-        """Captura un frame y realiza reconocimiento facial"""
-        if not self.is_running or not self.capture:
-            return None, []
-        
-        ret, frame = self.capture.read()
-        if not ret:
-            return None, []
-        
-        # Voltear el frame horizontalmente (efecto espejo)
-        frame = cv2.flip(frame, 1)
-        
-        # Realizar reconocimiento facial si ha pasado el intervalo
-        current_time = time.time()
-        if current_time - self.last_recognition_time >= self.recognition_interval:
-            self.last_recognition_time = current_time
-            try:
-                # Codificar frame con menor calidad para procesamiento más rápido
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                byte_im = buffer.tobytes()
-                
-                # Reconocer caras
-                data = recognition.recognize(byte_im)
-                results = data.get('result', [])
-                
-                with self.lock:
-                    self.recognition_results = results
-            except Exception as e:
-                logger.error(f"Error en reconocimiento facial: {str(e)}")
-                with self.lock:
-                    self.recognition_results = []
-        
-        # Dibujar recuadros y datos en el frame
-        with self.lock:
-            results = self.recognition_results.copy()
+    def _capture_loop(self):
+        """
+        Hilo de captura: lee frames mientras la webcam esté activa y los publica en el buffer.
+        read() bloquea hasta que la cámara entrega el siguiente frame, así que el ritmo lo pone la cámara.
+        """
+        raw = None
+        fps_start = time.time()
+        fps_frames = 0
+        while not self.stop_event.is_set():
+            # Reutilizar el arreglo de lectura: OpenCV escribe encima si el tamaño coincide
+            ret, raw = self.capture.read(raw)
+            if not ret:
+                self.read_failures += 1
+                raw = None
+                time.sleep(0.01)
+                continue
+            
+            # Voltear el frame horizontalmente (efecto espejo) directo en el slot del buffer
+            cv2.flip(raw, 1, dst=self.frames.next_slot(raw.shape, raw.dtype))
+            self.frames.publish()
+            self.frames_captured += 1
+            
+            fps_frames += 1
+            elapsed = time.time() - fps_start
+            if elapsed >= 1.0:
+                self.capture_fps = fps_frames / elapsed
+                fps_start = time.time()
+                fps_frames = 0
+        logger.info("Hilo de captura finalizado")
+    
+    def annotate_frame(self, frame, timestamp: float):
+        """Dibuja sobre el frame las caras seguidas, con el recuadro interpolado a la hora del frame (no espera a CompreFace)"""
+        results = self.tracker.faces(timestamp)
         
         for result in results:
             box = result.get('box')
@@ -149,13 +188,19 @@ class WebcamManager:
                 else:
                     cv2.putText(frame, "Desconocido", (box['x_min'], y_offset),
                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-        
-        return frame, results
+    
+    def get_capture_stats(self):
+        """Estadísticas del hilo de captura"""
+        return {
+            "frames_captured": self.frames_captured,
+            "read_failures": self.read_failures,
+            "capture_fps": round(self.capture_fps, 1),
+            "frame_seq": self.frames.seq
+        }
     
     def get_recognition_data(self):
-        """Obtiene los últimos datos de reconocimiento"""
-        with self.lock:
-            return self.recognition_results.copy()
+        """Obtiene el último resultado del reconocimiento (caras, secuencia y hora del frame)"""
+        return self.recognition_worker.latest()
 
 # Instancia global del WebcamManager
 webcam_manager = WebcamManager()
@@ -172,6 +217,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir las respuestas JSON grandes con brotli o gzip (el stream MJPEG nunca se comprime)
+app.add_middleware(CompresionMiddleware)
+
 # Carpeta temporal para guardar imágenes subidas
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -416,7 +464,12 @@ async def webcam_status():
     """
     return {
         "is_running": webcam_manager.is_running,
-        "status": "active" if webcam_manager.is_running else "inactive"
+        "status": "active" if webcam_manager.is_running else "inactive",
+        "capture": webcam_manager.get_capture_stats(),
+        "recognition": webcam_manager.recognition_worker.get_stats(),
+        "tracking": webcam_manager.tracker.get_stats(),
+        "motion": webcam_manager.motion_gate.get_stats(),
+        "stream": webcam_manager.broadcaster.get_stats()
     }
 
 
@@ -435,27 +488,21 @@ async def webcam_stream():
         )
     
     async def generate_frames():
-        """Genera frames de video con reconocimiento facial"""
+        """Envía los frames ya anotados y codificados por el broadcaster"""
+        queue = webcam_manager.broadcaster.subscribe()
         try:
             while webcam_manager.is_running:
-                frame, _ = await webcam_manager.get_frame_with_recognition()
-                
-                if frame is None:
-                    await asyncio.sleep(0.033)  # ~30 FPS
-                    continue
-                
-                # Codificar frame como JPEG
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                frame_bytes = buffer.tobytes()
-                
-                # Retornar en formato MJPEG
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                try:
+                    frame_part = await asyncio.wait_for(queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue  # Sin frames nuevos: volver a revisar si la webcam sigue activa
                 
-                await asyncio.sleep(0.033)  # ~30 FPS
+                # Cada parte ya viene en formato MJPEG (boundary + encabezado + JPEG)
+                yield frame_part
         except Exception as e:
             logger.error(f"Error en streaming: {str(e)}")
         finally:
+            webcam_manager.broadcaster.unsubscribe(queue)
             logger.info("Stream finalizado")
     
     return StreamingResponse(
@@ -478,26 +525,30 @@ async def get_recognition_data():
             "faces": []
         }
     
-    results = webcam_manager.get_recognition_data()
+    recognition_result = webcam_manager.get_recognition_data()
     
     # Solo extraer nombres de personas reconocidas
     faces = []
-    for result in results:
+    for result in recognition_result.faces:
         subjects = result.get('subjects', [])
         if subjects:
             # Obtener la mejor coincidencia
             best_match = max(subjects, key=lambda k: k.get('similarity', 0))
             faces.append({
                 "name": best_match.get('subject'),
-                "similarity": round(best_match.get('similarity', 0), 4)
+                "similarity": round(best_match.get('similarity', 0), 4),
+                "track_id": result.get('track_id')
             })
         else:
             faces.append({
                 "name": None,
-                "similarity": 0
+                "similarity": 0,
+                "track_id": result.get('track_id')
             })
     
     return {
         "status": "active",
+        "frame_seq": recognition_result.seq,
+        "timestamp": recognition_result.timestamp,
         "faces": faces
     }
@@ -0,0 +1,130 @@
+"""
+Difusión del stream MJPEG a varios clientes.
+
+Un hilo toma cada frame nuevo del buffer, le dibuja los resultados y lo codifica
+como JPEG una sola vez; los bytes (inmutables) se reparten a todos los clientes
+de /webcam/stream por colas acotadas, una por cliente. Un cliente lento pierde
+sus frames más viejos en vez de frenar a los demás o acumular memoria. El hilo
+solo corre mientras haya al menos un cliente conectado.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+
+from frame_buffer import FrameRing
+
+logger = logging.getLogger(__name__)
+
+# Calidad JPEG del stream
+STREAM_JPEG_QUALITY = 85
+
+# Frames pendientes por cliente antes de empezar a descartar los más viejos
+STREAM_QUEUE_SIZE = 2
+
+
+class MjpegBroadcaster:
+    def __init__(
+        self,
+        frames: FrameRing,
+        annotate: Callable,
+        jpeg_quality: int = STREAM_JPEG_QUALITY,
+        queue_size: int = STREAM_QUEUE_SIZE
+    ):
+        self.frames = frames
+        self.annotate = annotate  # annotate(frame, timestamp): dibuja sobre el frame (una vez por frame)
+        self.jpeg_quality = jpeg_quality
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]] = []
+        self._thread: Optional[threading.Thread] = None
+
+        self.encodes = 0
+        self.frames_dropped = 0
+        self.encodes_per_second = 0.0
+        self.encode_ms = 0.0  # Tiempo de anotar y codificar el último frame
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registrar un cliente (llamar desde el event loop) y devolver su cola de partes MJPEG"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append((queue, asyncio.get_running_loop()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="webcam-broadcast", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [(q, loop) for q, loop in self._subscribers if q is not queue]
+
+    @property
+    def viewers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _run(self):
+        last_seq = 0
+        fps_start = time.time()
+        fps_encodes = 0
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Sin clientes no se codifica nada; el próximo subscribe() arranca otro hilo
+                    self._thread = None
+                    break
+
+            seq, frame, timestamp = self.frames.wait_newer(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = seq
+
+            started = time.perf_counter()
+            try:
+                self.annotate(frame, timestamp)
+                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            except Exception as e:
+                logger.error(f"Error al codificar frame del stream: {str(e)}")
+                continue
+            part = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n'
+            self.encode_ms = (time.perf_counter() - started) * 1000
+            self.encodes += 1
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for queue, loop in subscribers:
+                try:
+                    loop.call_soon_threadsafe(self._offer, queue, part)
+                except RuntimeError:
+                    # El event loop del cliente ya se cerró
+                    self.unsubscribe(queue)
+
+            fps_encodes += 1
+            elapsed = time.time() - fps_start
+            if elapsed >= 1.0:
+                self.encodes_per_second = fps_encodes / elapsed
+                fps_start = time.time()
+                fps_encodes = 0
+        self.encodes_per_second = 0.0
+        logger.info("Hilo de difusión del stream finalizado")
+
+    def _offer(self, queue: asyncio.Queue, part: bytes):
+        """Agregar una parte a la cola de un cliente (en su event loop), descartando la más vieja si está llena"""
+        if queue.full():
+            queue.get_nowait()
+            self.frames_dropped += 1
+        queue.put_nowait(part)
+
+    def get_stats(self):
+        """Codificaciones por segundo frente a clientes conectados"""
+        return {
+            "viewers": self.viewers,
+            "encodes": self.encodes,
+            "encodes_per_second": round(self.encodes_per_second, 1),
+            "encode_ms": round(self.encode_ms, 2),
+            "frames_dropped": self.frames_dropped
+        }
@@ -0,0 +1,81 @@
+"""
+Compuerta de movimiento para el reconocimiento de la webcam.
+
+Antes de enviar un frame a CompreFace se compara una versión reducida en escala
+de grises (MOTION_FRAME_SIZE) con la del último frame enviado. Si cambió menos
+de MOTION_THRESHOLD de los píxeles, la escena está quieta: CompreFace devolvería
+lo mismo que la última vez y no se envía nada. Comparar contra el último frame
+enviado (y no contra el anterior) hace que también se detecten los cambios lentos.
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Fracción de píxeles que deben cambiar para considerar que hubo movimiento
+MOTION_THRESHOLD = 0.01
+
+# Diferencia mínima de gris (0-255) para contar un píxel como cambiado (filtra el ruido de la cámara)
+MOTION_PIXEL_DELTA = 25
+
+# Tamaño (ancho, alto) al que se reducen los frames antes de compararlos
+MOTION_FRAME_SIZE = (160, 120)
+
+
+class MotionGate:
+    def __init__(
+        self,
+        threshold: float = MOTION_THRESHOLD,
+        pixel_delta: int = MOTION_PIXEL_DELTA,
+        size: Tuple[int, int] = MOTION_FRAME_SIZE
+    ):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+
+        self._reference: Optional[np.ndarray] = None  # Último frame enviado (reducido)
+        self._candidate: Optional[np.ndarray] = None  # Último frame que pasó la compuerta
+
+        self.frames_gated = 0
+        self.frames_sent = 0
+        self.last_motion = 0.0  # Fracción de píxeles cambiados en la última comparación
+
+    def has_motion(self, frame, force: bool = False) -> bool:
+        """
+        Indicar si el frame cambió lo suficiente respecto al último enviado.
+        Con force=True el frame pasa aunque la escena esté quieta (y queda como candidato a referencia).
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._reference is None or self._reference.shape != small.shape:
+            self.last_motion = 1.0
+        else:
+            changed = cv2.absdiff(small, self._reference) > self.pixel_delta
+            self.last_motion = float(np.count_nonzero(changed)) / changed.size
+
+        if self.last_motion < self.threshold and not force:
+            self.frames_gated += 1
+            return False
+        self.frames_sent += 1
+        self._candidate = small
+        return True
+
+    def accept(self):
+        """Tomar como referencia el último frame que pasó (llamar cuando CompreFace respondió bien)"""
+        if self._candidate is not None:
+            self._reference = self._candidate
+
+    def reset(self):
+        self._reference = None
+        self._candidate = None
+        self.last_motion = 0.0
+
+    def get_stats(self):
+        """Frames retenidos por la compuerta frente a frames enviados"""
+        return {
+            "frames_gated": self.frames_gated,
+            "frames_sent": self.frames_sent,
+            "last_motion": round(self.last_motion, 4),
+            "threshold": self.threshold
+        }
@@ -0,0 +1,189 @@
+"""
+Reconocimiento facial de la webcam en segundo plano.
+
+Un solo hilo envía frames a CompreFace, así que nunca hay más de una petición
+en curso. Al terminar cada petición toma el frame más reciente del buffer: los
+frames capturados mientras esperaba la respuesta se descartan en vez de
+encolarse. El stream y los endpoints nunca esperan a CompreFace; solo leen el
+último resultado publicado, que indica de qué frame (secuencia y hora) salió.
+
+Con un FaceTracker el hilo consulta al tracker en cada intervalo: si todas las
+caras seguidas ya están confirmadas no se envía nada (cuenta como
+`tracker_skips`) y los recuadros siguen moviéndose con el tracker. Con una
+MotionGate tampoco se envía nada mientras la escena esté quieta respecto al
+último frame enviado.
+"""
+import logging
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+import cv2
+
+from face_tracker import FaceTracker
+from frame_buffer import FrameRing
+from motion_gate import MotionGate
+
+logger = logging.getLogger(__name__)
+
+# Calidad JPEG de los frames enviados a CompreFace (menor = más rápido)
+RECOGNITION_JPEG_QUALITY = 70
+
+
+class RecognitionResult(NamedTuple):
+    """Caras reconocidas en un frame"""
+    seq: int  # Secuencia del frame analizado
+    timestamp: float  # Hora de captura del frame (time.time())
+    faces: List[dict]  # Resultados de CompreFace ('result'), con track_id si hay tracker
+    latency: float  # Segundos que tardó CompreFace
+
+
+EMPTY_RESULT = RecognitionResult(seq=0, timestamp=0.0, faces=[], latency=0.0)
+
+
+class RecognitionWorker:
+    def __init__(
+        self,
+        frames: FrameRing,
+        recognize: Callable[[bytes], dict],
+        interval: float = 0.3,
+        jpeg_quality: int = RECOGNITION_JPEG_QUALITY,
+        tracker: Optional[FaceTracker] = None,
+        motion_gate: Optional[MotionGate] = None
+    ):
+        self.frames = frames
+        self.recognize = recognize
+        self.interval = interval  # Mínimo de segundos entre el inicio de dos peticiones
+        self.jpeg_quality = jpeg_quality
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+
+        self._lock = threading.Lock()
+        self._result = EMPTY_RESULT
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.requests = 0
+        self.errors = 0
+        self.frames_skipped = 0  # Frames no analizados (llegaron durante una petición o dentro del intervalo)
+        self.tracker_skips = 0  # Peticiones evitadas porque todas las caras seguidas estaban confirmadas
+
+    def start(self):
+        """Inicia el hilo de reconocimiento"""
+        if self._thread is not None:
+            return
+        # Un evento nuevo por arranque: un hilo anterior que siga esperando a CompreFace
+        # ve su propio evento activado y termina sin publicar
+        self._stop_event = threading.Event()
+        with self._lock:
+            self._result = EMPTY_RESULT
+        if self.tracker is not None:
+            self.tracker.clear()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), name="webcam-recognition", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Detiene el hilo. Si hay una petición en curso no se espera a CompreFace más
+        de un segundo: su resultado se descarta al volver.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        with self._lock:
+            self._result = EMPTY_RESULT
+        if self.tracker is not None:
+            self.tracker.clear()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def latest(self) -> RecognitionResult:
+        """Último resultado publicado"""
+        with self._lock:
+            return self._result
+
+    def publish(self, result: RecognitionResult):
+        with self._lock:
+            # Nunca reemplazar un resultado por otro de un frame más viejo
+            if result.seq >= self._result.seq:
+                self._result = result
+
+    def _run(self, stop_event: threading.Event):
+        last_seq = 0
+        next_request = 0.0
+        while not stop_event.is_set():
+            # Con trackers de OpenCV se procesa cada frame para mover los recuadros;
+            # si no, se espera directamente al próximo intervalo (se interrumpe al detener)
+            if self.tracker is None or not self.tracker.use_opencv_trackers:
+                if stop_event.wait(max(0.0, next_request - time.time())):
+                    break
+
+            seq, frame, timestamp = self.frames.wait_newer(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            if last_seq:
+                self.frames_skipped += seq - last_seq - 1
+            last_seq = seq
+
+            if self.tracker is not None:
+                if time.time() < next_request:
+                    self.tracker.refine(frame, timestamp)
+                    continue
+                if not self.tracker.needs_recognition(timestamp):
+                    self.tracker.refine(frame, timestamp)
+                    self.tracker_skips += 1
+                    next_request = time.time() + self.interval
+                    continue
+
+            next_request = time.time() + self.interval
+            # Escena quieta: CompreFace devolvería lo mismo que con el último frame enviado.
+            # Excepto si una cara seguida faltó en el último reconocimiento: hay que volver a
+            # consultar para olvidarla, aunque la escena ya no cambie (la persona se fue)
+            if self.motion_gate is not None:
+                missing = self.tracker is not None and self.tracker.has_missing_tracks()
+                if not self.motion_gate.has_motion(frame, force=missing):
+                    continue
+
+            errors = self.errors
+            result = self.process(seq, frame, timestamp)
+            if stop_event.is_set():
+                break
+            # Una petición fallida no cuenta como "no hay caras" para el tracker
+            # ni sirve de referencia para la compuerta de movimiento
+            if self.errors == errors:
+                if self.motion_gate is not None:
+                    self.motion_gate.accept()
+                if self.tracker is not None:
+                    self.tracker.update(result.faces, timestamp, frame)
+                    result = result._replace(faces=self.tracker.faces(timestamp))
+            self.publish(result)
+        logger.info("Hilo de reconocimiento finalizado")
+
+    def process(self, seq: int, frame, timestamp: float) -> RecognitionResult:
+        """Enviar un frame a CompreFace y devolver las caras reconocidas"""
+        started = time.time()
+        try:
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            self.requests += 1
+            data = self.recognize(buffer.tobytes())
+            faces = data.get('result', [])
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error en reconocimiento facial: {str(e)}")
+            faces = []
+        return RecognitionResult(seq, timestamp, faces, time.time() - started)
+
+    def get_stats(self):
+        """Estadísticas del reconocimiento"""
+        result = self.latest()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "frames_skipped": self.frames_skipped,
+            "tracker_skips": self.tracker_skips,
+            "last_frame_seq": result.seq,
+            "last_latency_ms": round(result.latency * 1000, 1)
+        }
@@ -151,12 +151,24 @@ const darkTheme = createTheme({
 
 type View = 'list' | 'form';
 
+// Usuarios por página al cargar la lista (paginación por cursor de /usuarios/pagina)
+const PAGE_SIZE = 200;
+
+// Normalizar IDs para compatibilidad
+const normalizeUsers = (data: User[]): User[] => data.map(user => ({
+  ...user,
+  _id: user.id,
+}));
+
 function App() {
   const [users, setUsers] = useState<User[]>([]);
   const [currentView, setCurrentView] = useState<View>('list');
   const [editingUser, setEditingUser] = useState<User | null>(null);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchResults, setSearchResults] = useState<User[] | null>(null);
   const [snackbar, setSnackbar] = useState({ 
     open: false, 
     message: '', 
@@ -168,16 +180,36 @@ function App() {
     loadUsers();
   }, []);
 
+  // Con la lista por páginas, la búsqueda se hace en la API (también encuentra usuarios aún no cargados)
+  useEffect(() => {
+    const termino = searchTerm.trim();
+    if (!termino) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const data = await apiService.searchUsers(termino);
+        if (!cancelled) setSearchResults(normalizeUsers(data));
+      } catch (error) {
+        console.error('Error al buscar usuarios:', error);
+        if (!cancelled) setSearchResults([]);
+      }
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
+  // Cargar la primera página (la lista completa puede tener miles de usuarios)
   const loadUsers = async () => {
     try {
       setLoading(true);
-      const data = await apiService.getUsers();
-      // Normalizar IDs para compatibilidad
-      const normalizedData = data.map(user => ({
-        ...user,
-        _id: user.id,
-      }));
-      setUsers(normalizedData);
+      const page = await apiService.getUsersPage({ limit: PAGE_SIZE });
+      setUsers(normalizeUsers(page.usuarios));
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error('Error al cargar usuarios:', error);
       setSnackbar({
@@ -190,6 +222,26 @@ function App() {
     }
   };
 
+  // Cargar la página siguiente a continuación de las ya cargadas
+  const loadMoreUsers = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getUsersPage({ cursor: nextCursor, limit: PAGE_SIZE });
+      setUsers(previous => [...previous, ...normalizeUsers(page.usuarios)]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error al cargar más usuarios:', error);
+      setSnackbar({
+        open: true,
+        message: 'Error al cargar más usuarios.',
+        severity: 'error',
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSaveUser = async (user: User): Promise<string | undefined> => {
     try {
       setLoading(true);
@@ -464,14 +516,10 @@ function App() {
                 />
               </Box>
               <UserList 
-                users={users.filter(user => {
-                  const search = searchTerm.toLowerCase();
-                  return (
-                    user.nombre.toLowerCase().includes(search) ||
-                    user.apellido.toLowerCase().includes(search) ||
-                    (user.codigo && user.codigo.toLowerCase().includes(search))
-                  );
-                })}
+                users={searchResults ?? users}
+                hasMore={searchResults === null && nextCursor !== null}
+                loadingMore={loadingMore}
+                onLoadMore={loadMoreUsers}
                 onEdit={handleEditUser}
                 onDelete={handleDeleteUser}
                 onFaceID={handleFaceID}
@@ -15,6 +15,7 @@ import {
   Select,
   MenuItem,
   SelectChangeEvent,
+  CircularProgress,
 } from '@mui/material';
 import { DataGrid, GridColDef, GridActionsCellItem } from '@mui/x-data-grid';
 import EditIcon from '@mui/icons-material/Edit';
@@ -22,16 +23,20 @@ import DeleteIcon from '@mui/icons-material/Delete';
 import FingerprintIcon from '@mui/icons-material/Fingerprint';
 import SortIcon from '@mui/icons-material/Sort';
 import FilterListIcon from '@mui/icons-material/FilterList';
+import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 import { User } from '../types/User';
 
 interface UserListProps {
   users: User[];
+  hasMore?: boolean; // Quedan páginas sin cargar en la API
+  loadingMore?: boolean;
+  onLoadMore?: () => void;
   onEdit: (user: User) => void;
   onDelete: (id: number) => void;
   onFaceID: (user: User) => void;
 }
 
-const UserList = ({ users, onEdit, onDelete, onFaceID }: UserListProps) => {
+const UserList = ({ users, hasMore = false, loadingMore = false, onLoadMore, onEdit, onDelete, onFaceID }: UserListProps) => {
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
   const [selectedUserId, setSelectedUserId] = useState<number | null>(null);
   const [sortBy, setSortBy] = useState<string>('nombre');
@@ -223,7 +228,7 @@ const UserList = ({ users, onEdit, onDelete, onFaceID }: UserListProps) => {
               letterSpacing: '-0.02em',
             }}
           >
-            Lista de Usuarios ({filteredAndSortedUsers.length})
+            Lista de Usuarios ({filteredAndSortedUsers.length}{hasMore ? '+' : ''})
           </Typography>
           
           <Box sx={{ display: 'flex', gap: 2 }}>
@@ -378,6 +383,31 @@ const UserList = ({ users, onEdit, onDelete, onFaceID }: UserListProps) => {
             }}
           />
         </Box>
+
+        {hasMore && onLoadMore && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+            <Button
+              variant="outlined"
+              onClick={onLoadMore}
+              disabled={loadingMore}
+              startIcon={loadingMore ? <CircularProgress size={18} sx={{ color: '#ff3b3b' }} /> : <ExpandMoreIcon />}
+              sx={{
+                color: '#ff3b3b',
+                borderColor: '#ff3b3b',
+                fontWeight: 600,
+                borderRadius: '12px',
+                borderWidth: '2px',
+                '&:hover': {
+                  borderColor: '#ff6b6b',
+                  borderWidth: '2px',
+                  backgroundColor: 'rgba(255, 59, 59, 0.1)',
+                },
+              }}
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más usuarios'}
+            </Button>
+          </Box>
+        )}
       </Paper>
 
       {/* Delete Confirmation Dialog */}
@@ -23,6 +23,11 @@ export interface ApiUser {
   updated_at?: string;
 }
 
+export interface ApiUserPage {
+  usuarios: ApiUser[];
+  next_cursor: string | null;
+}
+
 class ApiService {
   // Crear usuario
   async createUser(userData: Omit<ApiUser, 'id' | 'created_at' | 'updated_at'>): Promise<ApiUser> {
@@ -65,6 +70,24 @@ class ApiService {
     return response.json();
   }
 
+  // Obtener una página de usuarios (paginación por cursor)
+  async getUsersPage(params?: { cursor?: string | null; limit?: number; departamento?: string }): Promise<ApiUserPage> {
+    const queryParams = new URLSearchParams();
+    if (params?.cursor) queryParams.append('cursor', params.cursor);
+    if (params?.limit !== undefined) queryParams.append('limit', params.limit.toString());
+    if (params?.departamento) queryParams.append('departamento', params.departamento);
+
+    const url = `${API_BASE_URL}/usuarios/pagina${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
+
+    const response = await fetch(url);
+
+    if (!response.ok) {
+      throw new Error('Error al obtener usuarios');
+    }
+
+    return response.json();
+  }
+
   // Obtener usuario por ID
   async getUserById(id: number): Promise<ApiUser> {
     const response = await fetch(`${API_BASE_URL}/usuarios/${id}`);